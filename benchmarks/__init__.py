@@ -0,0 +1,7 @@
+"""Benchmarks for the Personal Operations Assistant.
+
+Run ``python -m benchmarks run --sizes 1000 100000`` to time every command
+and the hot storage functions against seeded synthetic data, and
+``python -m benchmarks compare OLD.json NEW.json`` to flag regressions
+between two result files.
+"""
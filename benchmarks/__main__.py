@@ -0,0 +1,71 @@
+"""Command line for the benchmark suite: ``python -m benchmarks``."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from .runner import compare, load, run
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Generate datasets and time every case")
+    run_parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="Rows per table (tasks, open loops, energy events) for each dataset",
+    )
+    run_parser.add_argument("--repeat", type=int, default=30, help="Timed runs per case (default: 30)")
+    run_parser.add_argument(
+        "--budget", type=float, default=10.0, help="Seconds per case before stopping early (default: 10)"
+    )
+    run_parser.add_argument("--seed", type=int, default=0, help="Generator seed (default: 0)")
+    run_parser.add_argument("--repos", type=int, default=3, help="Fake git repositories (default: 3)")
+    run_parser.add_argument("--commits", type=int, default=200, help="Commits per repository (default: 200)")
+    run_parser.add_argument("--only", nargs="+", help="Only run cases whose name contains one of these")
+    run_parser.add_argument("--output", "-o", type=Path, help="Write the JSON document here instead of stdout")
+
+    compare_parser = subparsers.add_parser("compare", help="Flag p50 regressions between two result files")
+    compare_parser.add_argument("old", type=Path)
+    compare_parser.add_argument("new", type=Path)
+    compare_parser.add_argument(
+        "--threshold", type=float, default=0.2, help="Allowed p50 slowdown as a fraction (default: 0.2)"
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        document = run(
+            args.sizes,
+            repeat=args.repeat,
+            budget=args.budget,
+            seed=args.seed,
+            repos=args.repos,
+            commits=args.commits,
+            only=args.only,
+        )
+        text = json.dumps(document, indent=2)
+        if args.output:
+            args.output.write_text(text + "\n", encoding="utf-8")
+        else:
+            print(text)
+        return 0
+
+    rows = compare(load(args.old), load(args.new), threshold=args.threshold)
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(
+            f"{row['size']:>9} {row['case']:<36} {row['old_p50_ms']:>10.3f} -> "
+            f"{row['new_p50_ms']:>10.3f} ms  x{row['ratio']:<6} {flag}"
+        )
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""Seeded synthetic data: tasks, open loops, energy events and git repositories."""
+
+from __future__ import annotations
+
+import os
+import random
+import subprocess
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+
+# Word pools chosen so generated text exercises every keyword rule category.
+VERBS = (
+    "build", "design", "architect", "research", "optimize", "refactor", "automate",
+    "script", "debug", "fix", "maintain", "document", "review", "update", "report",
+    "respond to", "email", "call", "schedule", "follow up on", "evaluate", "prototype",
+)
+OBJECTS = (
+    "prediction engine", "deployment pipeline", "support tickets", "knowledge base",
+    "internal API", "billing system", "onboarding template", "customer feedback",
+    "client report", "weekly metrics", "data model", "alerting bot", "release notes",
+    "interview loop", "conference talk", "search algorithm", "backup framework",
+    "travel budget", "experiment log", "monitoring dashboard",
+)
+QUALIFIERS = (
+    "", "", "", "again", "daily", "for the team", "manually", "with the client",
+    "before Friday", "v2", "from scratch", "for OB1", "novel approach",
+)
+LOOP_PREFIXES = ("Follow up with", "Maybe", "Should", "Consider", "Network with", "Ping", "Check")
+CATEGORIES = ("build", "automation", "research", "boring", "maintenance", "admin")
+ENERGY_NOTES = (
+    "Perfect time for a complex system build",
+    "Handle medium-intensity automation tasks",
+    "Stop pretending to work. Go walk.",
+)
+
+Task = Tuple[str, str, int, int, int, int, int, str, int]
+
+
+def description(rng: random.Random) -> str:
+    """Return one task-like sentence."""
+
+    words = [rng.choice(VERBS), rng.choice(OBJECTS), rng.choice(QUALIFIERS)]
+    return " ".join(word for word in words if word).capitalize()
+
+
+def iter_tasks(count: int, rng: random.Random) -> Iterator[Task]:
+    for _ in range(count):
+        yield (
+            description(rng),
+            rng.choice(CATEGORIES),
+            rng.randint(0, 3),
+            rng.randint(0, 3),
+            rng.randint(0, 3),
+            rng.randint(0, 3),
+            int(rng.random() < 0.3),
+            "done" if rng.random() < 0.2 else "pending",
+            int(rng.random() < 0.05),
+        )
+
+
+def iter_open_loops(count: int, rng: random.Random, now: datetime) -> Iterator[Tuple[str, str]]:
+    for _ in range(count):
+        created = now - timedelta(seconds=rng.randint(0, 90 * 86400))
+        text = f"{rng.choice(LOOP_PREFIXES)} {rng.choice(OBJECTS)}"
+        yield text, created.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def iter_energy_events(count: int, rng: random.Random, now: datetime) -> Iterator[Tuple[int, str, str]]:
+    # Spread over the last 30 days so the 6-hour window holds a realistic share.
+    for _ in range(count):
+        created = now - timedelta(seconds=rng.randint(0, 30 * 86400))
+        yield rng.randint(0, 100), rng.choice(ENERGY_NOTES), created.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _batches(rows: Iterator[tuple], size: int) -> Iterator[List[tuple]]:
+    batch: List[tuple] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def populate(
+    db_path: Path,
+    tasks: int,
+    open_loops: int,
+    energy_events: int,
+    seed: int = 0,
+    batch_size: int = 50000,
+) -> Dict[str, int]:
+    """Fill a freshly migrated database with synthetic rows.
+
+    The same ``seed`` always produces the same rows (timestamps are relative
+    to now), so runs on different commits measure the same workload.
+    """
+
+    from poa import storage
+
+    storage.setup_database(db_path)
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    with storage.transaction(db_path) as conn:
+        # Mark the database as seeded so the defaults do not get mixed in.
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('seeded', '1')")
+        for batch in _batches(iter_tasks(tasks, rng), batch_size):
+            conn.executemany(
+                """
+                INSERT INTO tasks (
+                    description, category, stimulation, system_building,
+                    automation_potential, human_interaction, repetitive, status,
+                    planned_for_week
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                batch,
+            )
+        for batch in _batches(iter_open_loops(open_loops, rng, now), batch_size):
+            conn.executemany("INSERT INTO open_loops (description, created_at) VALUES (?, ?)", batch)
+        for batch in _batches(iter_energy_events(energy_events, rng, now), batch_size):
+            conn.executemany(
+                "INSERT INTO energy_events (level, note, created_at) VALUES (?, ?, ?)", batch
+            )
+    conn.execute("ANALYZE")
+    return {"tasks": tasks, "open_loops": open_loops, "energy_events": energy_events}
+
+
+def _fast_import_stream(subjects: Sequence[str], start: int, step: int) -> bytes:
+    lines: List[str] = []
+    for mark, subject in enumerate(subjects, start=1):
+        timestamp = start + mark * step
+        message = subject.encode("utf-8")
+        content = str(mark)
+        lines.append("commit refs/heads/main")
+        lines.append(f"mark :{mark}")
+        lines.append(f"committer Bench <bench@example.invalid> {timestamp} +0000")
+        lines.append(f"data {len(message)}")
+        lines.append(subject)
+        if mark > 1:
+            lines.append(f"from :{mark - 1}")
+        lines.append("M 644 inline CHANGES")
+        lines.append(f"data {len(content)}")
+        lines.append(content)
+        lines.append("")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def make_git_repos(root: Path, repos: int, commits: int, seed: int = 0) -> List[Path]:
+    """Create ``repos`` repositories with ``commits`` commits each over the last week.
+
+    History is written with ``git fast-import`` so large repositories take
+    seconds rather than one process per commit.
+    """
+
+    rng = random.Random(seed)
+    env = dict(os.environ, GIT_CONFIG_GLOBAL=os.devnull, GIT_CONFIG_NOSYSTEM="1")
+    now = int(datetime.now().timestamp())
+    paths: List[Path] = []
+    for number in range(repos):
+        path = root / f"repo{number:03d}"
+        subprocess.run(["git", "init", "-q", "-b", "main", str(path)], check=True, env=env)
+        subjects = [description(rng) for _ in range(commits)]
+        step = max(1, (6 * 86400) // max(1, commits))
+        subprocess.run(
+            ["git", "fast-import", "--quiet"],
+            input=_fast_import_stream(subjects, now - 6 * 86400 - step, step),
+            cwd=path,
+            check=True,
+            env=env,
+        )
+        subprocess.run(["git", "reset", "-q", "--hard", "main"], cwd=path, check=True, env=env)
+        paths.append(path)
+    return paths
+
+
+__all__ = [
+    "CATEGORIES",
+    "description",
+    "iter_energy_events",
+    "iter_open_loops",
+    "iter_tasks",
+    "make_git_repos",
+    "populate",
+]
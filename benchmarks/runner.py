@@ -0,0 +1,328 @@
+"""Time assistant commands and storage functions against generated datasets.
+
+Each dataset size is generated in a fresh spawned process with its own
+data directory, so ``poa`` resolves ``POA_DATA_DIR`` before its modules are
+imported. Every case then runs in a spawned process of its own, so import
+state and peak RSS belong to that case alone.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+@dataclass
+class Case:
+    """One benchmarked callable; ``setup`` runs untimed before every call.
+
+    Cases run with the result cache off unless ``cached`` is set, so they
+    time the queries rather than cache hits.
+    """
+
+    name: str
+    func: Callable[[], object]
+    setup: Optional[Callable[[], None]] = None
+    cached: bool = False
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted ``samples``."""
+
+    if not samples:
+        return 0.0
+    rank = max(1, min(len(samples), int(round(q / 100 * len(samples) + 0.5))))
+    return samples[rank - 1]
+
+
+def peak_rss_kb() -> int:
+    """Peak resident set size of this process so far, in KiB."""
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kibibytes.
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def measure(case: Case, repeat: int, budget: float) -> Dict[str, float]:
+    """Run ``case`` up to ``repeat`` times (at least 3, within ``budget`` seconds)."""
+
+    samples: List[float] = []
+    started = time.perf_counter()
+    while len(samples) < repeat:
+        if case.setup is not None:
+            case.setup()
+        mark = time.perf_counter()
+        case.func()
+        samples.append(time.perf_counter() - mark)
+        if len(samples) >= 3 and time.perf_counter() - started > budget:
+            break
+    samples.sort()
+    total = sum(samples)
+    return {
+        "runs": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 4),
+        "p99_ms": round(percentile(samples, 99) * 1000, 4),
+        "mean_ms": round(total / len(samples) * 1000, 4),
+        "min_ms": round(samples[0] * 1000, 4),
+        "max_ms": round(samples[-1] * 1000, 4),
+        "ops_per_s": round(len(samples) / total, 2) if total else 0.0,
+    }
+
+
+def _consume(iterator) -> int:
+    count = 0
+    for _ in iterator:
+        count += 1
+    return count
+
+
+# Rotated through by the ``decide`` case; they cover every verdict.
+QUESTIONS = (
+    "Should I go to the networking meetup tonight?",
+    "Is the conference workshop worth it for learning?",
+    "Should I buy a faster build server?",
+    "Do I travel to the partner office next week?",
+)
+
+
+def build_cases(repos: List[Path], seed: int) -> List[Case]:
+    """Cases for every assistant command plus the storage functions behind them."""
+
+    from poa import gitlog, storage
+    from poa.assistant import PersonalOpsAssistant
+    from benchmarks.generate import description
+
+    assistant = PersonalOpsAssistant()
+    rng = random.Random(seed)
+    descriptions = [description(rng) for _ in range(10000)]
+    position = iter(range(1 << 62))
+
+    def evaluate() -> object:
+        return assistant.evaluate_task(descriptions[next(position) % len(descriptions)])
+
+    def decide() -> object:
+        return assistant.decide(QUESTIONS[next(position) % len(QUESTIONS)])
+
+    def clear_git_cache() -> None:
+        with storage.transaction() as conn:
+            conn.execute("DELETE FROM git_commits")
+            conn.execute("DELETE FROM git_heads")
+
+    project_repos = {path.name: path for path in repos}
+    cwd = repos[-1] if repos else None
+    cases = [
+        Case("morning_brief", assistant.morning_brief),
+        Case("cognitive_load_manager", lambda: assistant.cognitive_load_manager(dry_run=True)),
+        Case("energy_tracker", assistant.energy_tracker),
+        Case("evaluate_task", evaluate),
+        Case("weekly_reality_check", lambda: assistant.weekly_reality_check(cwd=cwd)),
+        Case("schedule", assistant.schedule),
+        Case("decide", decide),
+        Case("ob1_focus", assistant.ob1_focus),
+        Case("search", lambda: assistant.search(descriptions[next(position) % len(descriptions)])),
+        Case("dashboard", lambda: assistant.dashboard(cwd=cwd)),
+        # Logs a focus session per call, which lowers energy_tracker's level:
+        # keep it after every case that reads focus history.
+        Case("focus_protector", assistant.focus_protector),
+        Case("storage.fetch_tasks", storage.fetch_tasks),
+        Case("storage.fetch_top_task", storage.fetch_top_task),
+        Case("storage.fetch_ignorable_tasks", storage.fetch_ignorable_tasks),
+        Case("storage.iter_open_loops", lambda: _consume(storage.iter_open_loops())),
+        Case("storage.iter_planned_tasks", lambda: _consume(storage.iter_planned_tasks())),
+        Case("storage.fetch_recent_energy", storage.fetch_recent_energy),
+        Case("storage.recent_energy_stats", storage.recent_energy_stats),
+        # Hits of the read-through result cache, for comparison.
+        Case("cached.morning_brief", assistant.morning_brief, cached=True),
+        Case("cached.storage.fetch_tasks", storage.fetch_tasks, cached=True),
+    ]
+    if project_repos:
+        cases.append(
+            Case(
+                "gitlog.sync_repositories.cold",
+                lambda: gitlog.sync_repositories(project_repos),
+                setup=clear_git_cache,
+            )
+        )
+        cases.append(Case("gitlog.sync_repositories.warm", lambda: gitlog.sync_repositories(project_repos)))
+    return cases
+
+
+def run_size(
+    size: int,
+    repeat: int,
+    budget: float,
+    seed: int,
+    repos: int,
+    commits: int,
+    only: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """Generate a dataset of ``size`` rows per table and time every case on it.
+
+    Meant to run in a fresh process: it points ``POA_DATA_DIR`` at a
+    temporary directory before importing ``poa``.
+    """
+
+    with tempfile.TemporaryDirectory(prefix=f"poa-bench-{size}-") as tmp:
+        root = Path(tmp)
+        os.environ["POA_DATA_DIR"] = str(root / "data")
+        # Keep the configured OB1 checkout out of the measurement.
+        os.environ["POA_OB1_PATH"] = str(root / "no-ob1")
+        os.environ["POA_RESULT_CACHE"] = "0"
+
+        from benchmarks.generate import make_git_repos, populate
+        from poa import storage
+        from poa.config import DB_PATH
+
+        started = time.perf_counter()
+        populate(DB_PATH, tasks=size, open_loops=size, energy_events=size, seed=seed)
+        populated = time.perf_counter()
+        repo_paths = make_git_repos(root / "repos", repos, commits, seed=seed) if repos else []
+        generated = time.perf_counter()
+
+        cases = [(case.name, case.cached) for case in build_cases(repo_paths, seed)]
+        storage.close_connections()
+        results: Dict[str, Any] = {}
+        for name, cached in cases:
+            if only and not any(pattern in name for pattern in only):
+                continue
+            # A fresh process per case, so its peak RSS is the case's own and
+            # not the dataset generation's. It inherits POA_DATA_DIR.
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                future = pool.submit(run_case, name, repo_paths, seed, repeat, budget, cached)
+                results[name] = future.result()
+        return {
+            "rows_per_table": size,
+            "repos": repos,
+            "commits_per_repo": commits,
+            "populate_s": round(populated - started, 3),
+            "git_setup_s": round(generated - populated, 3),
+            "cases": results,
+        }
+
+
+def run_case(
+    name: str, repos: List[Path], seed: int, repeat: int, budget: float, cached: bool = False
+) -> Dict[str, Any]:
+    """Time one case of ``build_cases`` and report this process's memory around it.
+
+    ``peak_rss_kb`` is the process peak (interpreter, imports and case);
+    ``rss_growth_kb`` is how far the case raised it beyond the setup.
+    ``cached`` turns the result cache on; it must match the case's flag.
+    """
+
+    # Read when ``poa.config`` is first imported, which happens below.
+    os.environ["POA_RESULT_CACHE"] = "1" if cached else "0"
+    from poa import storage
+
+    case = next(case for case in build_cases(repos, seed) if case.name == name)
+    before = peak_rss_kb()
+    stats = measure(case, repeat, budget)
+    storage.close_connections()
+    peak = peak_rss_kb()
+    stats["peak_rss_kb"] = peak
+    stats["rss_growth_kb"] = peak - before
+    return stats
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(
+    sizes: Sequence[int],
+    repeat: int = 30,
+    budget: float = 10.0,
+    seed: int = 0,
+    repos: int = 3,
+    commits: int = 200,
+    only: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """Benchmark every size in its own spawned process; return one JSON document."""
+
+    document: Dict[str, Any] = {
+        "meta": {
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": {},
+    }
+    for size in sizes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            future = pool.submit(run_size, size, repeat, budget, seed, repos, commits, only)
+            document["results"][str(size)] = future.result()
+    return document
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float = 0.2) -> List[Dict[str, Any]]:
+    """Pair up cases present in both documents and flag p50 regressions.
+
+    A case regresses when its new p50 exceeds the old one by more than
+    ``threshold`` (a fraction).
+    """
+
+    rows: List[Dict[str, Any]] = []
+    for size, new_result in new["results"].items():
+        old_cases = old["results"].get(size, {}).get("cases", {})
+        for name, stats in new_result["cases"].items():
+            before = old_cases.get(name)
+            if before is None or not before["p50_ms"]:
+                continue
+            ratio = stats["p50_ms"] / before["p50_ms"]
+            rows.append(
+                {
+                    "size": int(size),
+                    "case": name,
+                    "old_p50_ms": before["p50_ms"],
+                    "new_p50_ms": stats["p50_ms"],
+                    "old_p99_ms": before["p99_ms"],
+                    "new_p99_ms": stats["p99_ms"],
+                    "ratio": round(ratio, 3),
+                    "regression": ratio > 1 + threshold,
+                }
+            )
+    return rows
+
+
+def load(path: Path) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+__all__ = [
+    "Case",
+    "QUESTIONS",
+    "build_cases",
+    "compare",
+    "load",
+    "measure",
+    "percentile",
+    "run",
+    "run_case",
+    "run_size",
+]
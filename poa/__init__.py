@@ -1,5 +1,15 @@
 """Personal Operations Assistant package."""
 
-from .assistant import PersonalOpsAssistant
+from typing import Any
 
 __all__ = ["PersonalOpsAssistant"]
+
+
+def __getattr__(name: str) -> Any:
+    # Imported lazily so that thin clients (``poa`` talking to a running
+    # daemon) do not pay for loading the assistant and its storage layer.
+    if name == "PersonalOpsAssistant":
+        from .assistant import PersonalOpsAssistant
+
+        return PersonalOpsAssistant
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,20 +2,48 @@
 
 from __future__ import annotations
 
+import asyncio
+import functools
+import math
 import random
-import subprocess
+import time
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, TextIO, Tuple
 
-from . import storage
-from .config import PROJECTS
+from . import astorage, dedupe, gitlog, profiling, scheduler, storage, transfer, writer
+from .config import (
+    ARCHIVE_RETENTION_DAYS,
+    BUFFERED_WRITES,
+    DUPLICATE_THRESHOLD,
+    MATCH_THRESHOLD,
+    PROJECTS,
+    SCHEDULE_HISTORY_DAYS,
+)
+from .matching import TokenIndex, token_forms, tokenize
+from .rules import match_keywords
 
 
 @dataclass
 class Task:
-    """A lightweight representation of a stored task."""
+    """A lightweight, slotted representation of a stored task.
+
+    ``priority`` is read from the generated column rather than recomputed.
+    """
+
+    __slots__ = (
+        "id",
+        "description",
+        "category",
+        "stimulation",
+        "system_building",
+        "automation_potential",
+        "human_interaction",
+        "repetitive",
+        "status",
+        "priority",
+    )
 
     id: int
     description: str
@@ -26,58 +54,86 @@ class Task:
     human_interaction: int
     repetitive: bool
     status: str
-
-    @property
-    def priority(self) -> int:
-        """Compute the priority using the brutalist algorithm."""
-
-        return (
-            self.stimulation * 3
-            + self.system_building * 2
-            + self.automation_potential * 2
-            - self.human_interaction * 5
-        )
+    priority: int
 
 
 def _row_to_task(row) -> Task:
     return Task(
-        id=row["id"],
-        description=row["description"],
-        category=row["category"],
-        stimulation=row["stimulation"],
-        system_building=row["system_building"],
-        automation_potential=row["automation_potential"],
-        human_interaction=row["human_interaction"],
-        repetitive=bool(row["repetitive"]),
-        status=row["status"],
+        row["id"],
+        row["description"],
+        row["category"],
+        row["stimulation"],
+        row["system_building"],
+        row["automation_potential"],
+        row["human_interaction"],
+        bool(row["repetitive"]),
+        row["status"],
+        row["priority"],
     )
 
 
+# Keyword category -> (stored close reason, or None to delete; report label).
+# The first matching rule wins.
+_LOOP_ACTIONS: Tuple[Tuple[str, Optional[str], str], ...] = (
+    ("loop_follow_up", None, "Deleted (they'll chase you if it's real)"),
+    ("loop_speculative", "Moved to /dev/null", "Moved to /dev/null"),
+    ("loop_networking", "Number blocked", "Blocked number"),
+)
+
+
+def _classify_loop(description: str) -> Optional[Tuple[Optional[str], str]]:
+    hits = match_keywords(description)
+    for category, reason, label in _LOOP_ACTIONS:
+        if category in hits:
+            return reason, label
+    return None
+
+
+def _on_shard(method: Callable) -> Callable:
+    """Run a storage-backed method against the assistant's own database."""
+
+    @functools.wraps(method)
+    def wrapper(self: "PersonalOpsAssistant", *args, **kwargs):
+        with storage.use_database(self.db_path):
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
 class PersonalOpsAssistant:
-    """Brain-dead honest assistant tuned for antisocial creatives."""
+    """Brain-dead honest assistant tuned for antisocial creatives.
 
-    def __init__(self) -> None:
-        storage.setup_database()
-        storage.seed_defaults()
+    ``user`` selects that user's shard (``storage.shard_path``); without it
+    the assistant uses the database active when it is created.
+    """
+
+    def __init__(self, user: Optional[str] = None) -> None:
+        self.user = user
+        self.db_path = storage.shard_path(user) if user else storage.current_database()
+        # Seeding happens inside the migration, so a current database costs
+        # one PRAGMA read here.
+        storage.setup_database(self.db_path, seed=True)
+        if BUFFERED_WRITES:
+            writer.install()
 
     # ------------------------------------------------------------------
     # Morning brief
     # ------------------------------------------------------------------
+    @_on_shard
     def morning_brief(self) -> Dict[str, object]:
-        tasks = [_row_to_task(row) for row in storage.fetch_tasks()]
-        complex_task = next((task for task in tasks if task.priority >= 10), None)
-        if complex_task is None and tasks:
-            complex_task = tasks[0]
-
-        boring_task = next(
-            (task for task in tasks if task.category in {"boring", "maintenance"}),
-            None,
-        )
-        ignore_tasks = [
-            task
-            for task in tasks
-            if task.human_interaction >= 2 or task.priority <= 0
-        ][:3]
+        # Served from memory until a task changes, in this process or another.
+        return storage.cached_call(("tasks",), "morning_brief", self._morning_brief)
+
+    def _morning_brief(self) -> Dict[str, object]:
+        # The first task with priority >= 10 in priority order is simply the
+        # top task, which is also the fallback, so one LIMIT 1 lookup covers both.
+        with storage.transaction():
+            top_row = storage.fetch_top_task()
+            boring_row = storage.fetch_chore_task()
+            ignore_rows = storage.fetch_ignorable_tasks(limit=3)
+        complex_task = _row_to_task(top_row) if top_row else None
+        boring_task = _row_to_task(boring_row) if boring_row else None
+        ignore_tasks = [_row_to_task(row) for row in ignore_rows]
 
         return {
             "energy_focus": complex_task.description if complex_task else "Build anything worthwhile",
@@ -88,7 +144,7 @@ class PersonalOpsAssistant:
     # ------------------------------------------------------------------
     # Task evaluation
     # ------------------------------------------------------------------
-    def evaluate_task(self, description: str) -> Dict[str, object]:
+    def evaluate_task(self, description: str, check_duplicates: bool = False) -> Dict[str, object]:
         metrics = self._score_description(description)
         score = (
             metrics["intellectual_stimulation"] * 3
@@ -109,16 +165,49 @@ class PersonalOpsAssistant:
 
         alternative = self._suggest_alternative(description, metrics)
 
-        return {
+        result: Dict[str, object] = {
             "score": score,
             "reason": ", ".join(reason_parts),
             "alternative": alternative,
         }
+        if check_duplicates:
+            result["duplicates"] = self.find_duplicates(description)
+        return result
+
+    @_on_shard
+    def find_duplicates(self, description: str, limit: int = 5) -> List[Dict[str, object]]:
+        """Existing active tasks whose wording nearly matches ``description``.
+
+        A task can only reach ``DUPLICATE_THRESHOLD`` (Jaccard) if it shares
+        at least that share of the query's stemmed tokens, so the full-text
+        index is asked for every task holding that many of them, each token
+        matched through any of the query words that stem to it. Stemmed
+        token overlap then decides, over all candidates, before the best
+        ``limit`` are kept.
+        """
+
+        forms = token_forms(description)
+        tokens = frozenset(forms)
+        terms = [" OR ".join(f'"{word}"' for word in words) for words in forms.values()]
+        match = storage.fts_combine(
+            [term if len(words) == 1 else f"({term})" for term, words in zip(terms, forms.values())],
+            min_terms=math.ceil(DUPLICATE_THRESHOLD * len(tokens)),
+        )
+        if match is None:
+            return []
+        duplicates = []
+        for row in storage.iter_similar_tasks(match):
+            other = tokenize(row["description"])
+            similarity = len(tokens & other) / len(tokens | other)
+            if similarity >= DUPLICATE_THRESHOLD:
+                duplicates.append(
+                    {"id": row["id"], "description": row["description"], "similarity": round(similarity, 3)}
+                )
+        duplicates.sort(key=lambda duplicate: (-duplicate["similarity"], duplicate["id"]))
+        return duplicates[:limit]
 
     def _score_description(self, description: str) -> Dict[str, int]:
-        lowered = description.lower()
-        def flag(*keywords: str) -> int:
-            return 1 if any(word in lowered for word in keywords) else 0
+        hits = match_keywords(description)
 
         metrics = {
             "intellectual_stimulation": 0,
@@ -128,27 +217,27 @@ class PersonalOpsAssistant:
             "repetition": 0,
         }
 
-        if flag("build", "design", "architect", "engine", "model", "algorithm"):
+        if "stimulating" in hits:
             metrics["intellectual_stimulation"] = 2
-        if flag("research", "experiment", "novel"):
+        if "research" in hits:
             metrics["intellectual_stimulation"] = max(metrics["intellectual_stimulation"], 3)
-        if flag("optimize", "refactor", "system", "pipeline", "automation", "framework"):
+        if "systemic" in hits:
             metrics["system_building"] = 2
-        if flag("automate", "automation", "script", "template", "bot"):
+        if "automatable" in hits:
             metrics["automation_potential"] = 3
-        elif flag("repeat", "daily", "weekly", "boring", "manual"):
+        elif "tedious" in hits:
             metrics["automation_potential"] = 2
-        if flag("email", "call", "meeting", "customer", "client", "interview", "conference"):
+        if "human_heavy" in hits:
             metrics["human_interaction"] = 3
-        elif flag("review", "feedback", "sync"):
+        elif "human_light" in hits:
             metrics["human_interaction"] = 2
-        if flag("again", "follow up", "respond", "update", "report"):
+        if "repetition" in hits:
             metrics["repetition"] = 1
 
-        if metrics["intellectual_stimulation"] == 0 and flag("debug", "fix", "maintain"):
+        if metrics["intellectual_stimulation"] == 0 and "maintenance" in hits:
             metrics["intellectual_stimulation"] = 1
 
-        if metrics["system_building"] == 0 and flag("build"):
+        if metrics["system_building"] == 0 and "building" in hits:
             metrics["system_building"] = 1
 
         if metrics["automation_potential"] == 0 and metrics["repetition"]:
@@ -157,10 +246,9 @@ class PersonalOpsAssistant:
         return metrics
 
     def _suggest_alternative(self, description: str, metrics: Dict[str, int]) -> str:
-        lowered = description.lower()
         if metrics["human_interaction"] >= 2:
             return "Automate the interaction – design a template or a bot and stop talking to humans"
-        if "document" in lowered or "doc" in lowered:
+        if "documentation" in match_keywords(description):
             return "Record a loom, auto-transcribe, and ship docs without typing"
         if metrics["repetition"]:
             return "Spend 90 minutes scripting it once, save yourself forever"
@@ -169,6 +257,7 @@ class PersonalOpsAssistant:
     # ------------------------------------------------------------------
     # Focus protector
     # ------------------------------------------------------------------
+    @_on_shard
     def focus_protector(self) -> Dict[str, object]:
         storage.add_focus_session(90, "Deep work initiated by focus protector")
         storage.record_activity("focus_mode", {"duration": 90})
@@ -183,14 +272,14 @@ class PersonalOpsAssistant:
     # Decision maker
     # ------------------------------------------------------------------
     def decide(self, question: str) -> Dict[str, object]:
-        lowered = question.lower()
-        networking = any(word in lowered for word in ["conference", "meet", "network", "event", "call"])
-        knowledge_gain = any(word in lowered for word in ["learn", "workshop", "course", "deep dive", "technical"])
-        logistics = any(word in lowered for word in ["travel", "flight", "hotel", "schedule"])
+        hits = match_keywords(question)
+        networking = "networking" in hits
+        knowledge_gain = "knowledge" in hits
+        logistics = "logistics" in hits
         verdict = "Skip. Watch recordings at 2x speed instead."
         if knowledge_gain and not networking:
             verdict = "Attend only if recordings aren't available. Otherwise stream at 2x."
-        elif not networking and "buy" in lowered:
+        elif not networking and "purchase" in hits:
             verdict = "Purchase if it accelerates automation. Otherwise pass."
         friction = "HIGH" if networking else ("MEDIUM" if logistics else "LOW")
         return {
@@ -205,17 +294,15 @@ class PersonalOpsAssistant:
     # ------------------------------------------------------------------
     # Energy tracker
     # ------------------------------------------------------------------
+    @_on_shard
     def energy_tracker(self) -> Dict[str, object]:
-        now = datetime.now()
-        base = 80 if 8 <= now.hour <= 12 else 60
-        if now.hour >= 20 or now.hour <= 6:
-            base = 35
+        base = scheduler.baseline_energy(datetime.now().hour)
         recent_sessions = storage.last_focus_session(within_hours=8)
         if recent_sessions:
             base -= 10
-        recent_energy = storage.fetch_recent_energy()
-        if recent_energy:
-            base = int((base + sum(row["level"] for row in recent_energy) / len(recent_energy)) / 2)
+        recent_energy = storage.recent_energy_stats(hours=6)
+        if recent_energy["samples"]:
+            base = int((base + recent_energy["total"] / recent_energy["samples"]) / 2)
         base = max(0, min(100, base))
 
         if base < 30:
@@ -231,14 +318,79 @@ class PersonalOpsAssistant:
             "suggestion": suggestion,
         }
 
+    # ------------------------------------------------------------------
+    # Weekly schedule
+    # ------------------------------------------------------------------
+    @_on_shard
+    def schedule(self, days: int = 7) -> Dict[str, object]:
+        """Pack active tasks into focus blocks over the next ``days`` days.
+
+        Block energy follows the hour-of-day curve learnt from the hourly
+        energy rollups; see ``poa.scheduler``. Nothing is stored.
+        """
+
+        started = time.perf_counter()
+        since = datetime.utcnow() - timedelta(days=SCHEDULE_HISTORY_DAYS)
+        curve = scheduler.energy_curve(storage.fetch_energy_rollups("energy_hourly", since=since))
+        blocks = scheduler.week_blocks(datetime.now(), curve, days=days)
+        rows = (
+            row
+            for batch in storage.iter_task_columns(scheduler.CANDIDATE_COLUMNS, active_only=True)
+            for row in batch
+        )
+        candidates, pending = scheduler.select_candidates(rows, len(blocks))
+        selected = time.perf_counter()
+        assignment, stats = scheduler.plan(candidates, blocks)
+        planned = time.perf_counter()
+        scheduled = sum(task is not None for task in assignment)
+        return {
+            "days": days,
+            "pending": pending,
+            "scheduled": scheduled,
+            "unscheduled": pending - scheduled,
+            "blocks": [
+                {
+                    "start": block.start.strftime("%Y-%m-%d %H:%M"),
+                    "end": block.end.strftime("%H:%M"),
+                    "energy": round(block.energy),
+                    "task": None
+                    if task is None
+                    else {
+                        "id": task.id,
+                        "description": task.description,
+                        "category": task.category,
+                        "priority": task.priority,
+                        "demand": task.demand,
+                        "fit": round(scheduler.fit(block.energy, task.demand), 2),
+                    },
+                }
+                for block, task in zip(blocks, assignment)
+            ],
+            "energy_curve": [round(level) for level in curve],
+            "search": stats,
+            "timings_ms": {
+                "select": round((selected - started) * 1000, 3),
+                "plan": round((planned - selected) * 1000, 3),
+            },
+        }
+
     # ------------------------------------------------------------------
     # Weekly reality check
     # ------------------------------------------------------------------
-    def weekly_reality_check(self) -> Dict[str, object]:
-        planned = [_row_to_task(row) for row in storage.fetch_planned_tasks()]
-        planned_descriptions = [task.description for task in planned] or ["You planned nothing, congrats"]
-        actual = self._git_activity_last_week()
-        accuracy = self._calculate_accuracy(planned_descriptions, actual)
+    @_on_shard
+    def weekly_reality_check(self, cwd: Optional[Path] = None, sync: bool = True) -> Dict[str, object]:
+        """Compare planned tasks with last week's commits.
+
+        ``sync=False`` reads the git cache as it is, for callers that have
+        already synced the repositories.
+        """
+
+        planned_descriptions = [
+            row["description"] for row in storage.iter_planned_tasks()
+        ] or ["You planned nothing, congrats"]
+        actual = self._git_activity_last_week(cwd, sync=sync)
+        matches = self._match_planned(planned_descriptions, actual)
+        accuracy = self._accuracy_from_matches(matches)
         recommendation = (
             "Stop planning, start building"
             if accuracy < 50
@@ -248,31 +400,99 @@ class PersonalOpsAssistant:
             "planned": planned_descriptions,
             "actual": actual,
             "accuracy": accuracy,
+            "matches": [
+                {
+                    "planned": task,
+                    "commit": actual[match[0]] if match else None,
+                    "score": round(match[1], 2) if match else 0.0,
+                }
+                for task, match in zip(planned_descriptions, matches)
+            ],
             "recommendation": recommendation,
         }
 
-    def _git_activity_last_week(self) -> List[str]:
-        try:
-            output = subprocess.check_output(
-                [
-                    "git",
-                    "log",
-                    "--since=7.days",
-                    "--pretty=format:%h %s",
-                ],
-                cwd=Path.cwd(),
-                text=True,
-            )
-        except subprocess.CalledProcessError:
+    def _git_activity_last_week(self, cwd: Optional[Path] = None, sync: bool = True) -> List[str]:
+        repos = gitlog.project_repositories(cwd or Path.cwd())
+        if not repos:
+            return ["No git history accessible"]
+        # Failed or slow repositories fall back to whatever is cached.
+        if sync:
+            with profiling.phase("weekly:git_sync"):
+                gitlog.sync_repositories(repos)
+        commits = gitlog.recent_activity(repos, days=7)
+        if not commits and all(storage.cached_git_head(str(path)) is None for path in repos.values()):
             return ["No git history accessible"]
-        commits = [line.strip() for line in output.splitlines() if line.strip()]
         return commits or ["No commits in the last 7 days"]
 
-    def _calculate_accuracy(self, planned: List[str], actual: List[str]) -> int:
-        if not planned:
+    def _match_planned(
+        self, planned: List[str], actual: List[str]
+    ) -> List[Optional[Tuple[int, float]]]:
+        """Match each planned task to its best commit by token overlap."""
+
+        index = TokenIndex(actual)
+        return [index.best_match(task, MATCH_THRESHOLD) for task in planned]
+
+    def _accuracy_from_matches(self, matches: List[Optional[Tuple[int, float]]]) -> int:
+        if not matches:
             return 0
-        matches = sum(1 for task in planned if any(task.lower() in entry.lower() for entry in actual))
-        return int((matches / len(planned)) * 100)
+        hits = sum(1 for match in matches if match is not None)
+        return int((hits / len(matches)) * 100)
+
+    def _calculate_accuracy(self, planned: List[str], actual: List[str]) -> int:
+        return self._accuracy_from_matches(self._match_planned(planned, actual))
+
+    # ------------------------------------------------------------------
+    # Dashboard
+    # ------------------------------------------------------------------
+    def dashboard(self, cwd: Optional[Path] = None) -> Dict[str, object]:
+        """Morning brief, energy, load (dry run) and weekly check in one document."""
+
+        return asyncio.run(self.dashboard_async(cwd))
+
+    async def dashboard_async(self, cwd: Optional[Path] = None) -> Dict[str, object]:
+        """Compute the dashboard sections concurrently; latency tracks the slowest.
+
+        Each section runs on the ``poa.astorage`` pool and the weekly check's
+        git logs run as asyncio subprocesses. A failing section reports its
+        error without sinking the others.
+        """
+
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+
+        async def timed(name: str, pending: Awaitable[Dict[str, object]]) -> Dict[str, object]:
+            mark = time.perf_counter()
+            try:
+                return await pending
+            finally:
+                timings[name] = round((time.perf_counter() - mark) * 1000, 3)
+
+        async def weekly() -> Dict[str, object]:
+            repos = gitlog.project_repositories(cwd or Path.cwd())
+            with storage.use_database(self.db_path):
+                await gitlog.sync_repositories_async(repos)
+            return await astorage.run(self.weekly_reality_check, cwd, sync=False)
+
+        sections = {
+            "morning": astorage.run(self.morning_brief),
+            "energy": astorage.run(self.energy_tracker),
+            "load": astorage.run(self.cognitive_load_manager, dry_run=True),
+            "weekly": weekly(),
+        }
+        results = await asyncio.gather(
+            *(timed(name, pending) for name, pending in sections.items()), return_exceptions=True
+        )
+        document: Dict[str, object] = {}
+        for name, result in zip(sections, results):
+            if isinstance(result, Exception):
+                document[name] = {"error": f"{type(result).__name__}: {result}"}
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                document[name] = result
+        timings["total"] = round((time.perf_counter() - started) * 1000, 3)
+        document["timings_ms"] = timings
+        return document
 
     # ------------------------------------------------------------------
     # OB1 integration
@@ -293,30 +513,177 @@ class PersonalOpsAssistant:
     # ------------------------------------------------------------------
     # Cognitive load manager
     # ------------------------------------------------------------------
-    def cognitive_load_manager(self) -> Dict[str, object]:
-        loops = storage.fetch_open_loops()
+    @_on_shard
+    def cognitive_load_manager(self, dry_run: bool = False) -> Dict[str, object]:
+        started = time.perf_counter()
+        deletes: List[int] = []
+        closes: List[Tuple[int, str]] = []
         auto_closed: List[str] = []
-        remaining: List[str] = []
-        for loop in loops:
-            description = loop["description"].lower()
-            if "follow up" in description:
-                storage.delete_open_loop(loop["id"])
-                auto_closed.append(f"{loop['description']} → Deleted (they'll chase you if it's real)")
-            elif any(keyword in description for keyword in ["maybe", "should", "consider"]):
-                storage.close_open_loop(loop["id"], "Moved to /dev/null")
-                auto_closed.append(f"{loop['description']} → Moved to /dev/null")
-            elif "network" in description:
-                storage.close_open_loop(loop["id"], "Number blocked")
-                auto_closed.append(f"{loop['description']} → Blocked number")
+        focus: Optional[str] = None
+        loop_count = 0
+        classify_seconds = 0.0
+        # Rows stream in batches; only the ids to change are kept in memory.
+        for loop in storage.iter_open_loops():
+            loop_count += 1
+            mark = time.perf_counter()
+            action = _classify_loop(loop["description"])
+            classify_seconds += time.perf_counter() - mark
+            if action is None:
+                if focus is None:
+                    focus = loop["description"]
+                continue
+            reason, label = action
+            if reason is None:
+                deletes.append(loop["id"])
             else:
-                remaining.append(loop["description"])
+                closes.append((loop["id"], reason))
+            auto_closed.append(f"{loop['description']} → {label}")
+        classified = time.perf_counter()
+
+        if not dry_run:
+            storage.apply_open_loop_actions(deletes, closes)
+        applied = time.perf_counter()
 
-        focus = remaining[0] if remaining else "OB1 prediction engine"
         return {
-            "load": min(100, 20 + len(loops) * 5),
-            "open_loops": len(loops),
+            "load": min(100, 20 + loop_count * 5),
+            "open_loops": loop_count,
             "auto_closed": auto_closed or ["Nothing disposable left"],
-            "remaining_focus": focus,
+            "remaining_focus": focus or "OB1 prediction engine",
             "mode": "Cave dwelling (no inputs, pure building)",
+            "dry_run": dry_run,
+            "timings_ms": {
+                "fetch": round((classified - started - classify_seconds) * 1000, 3),
+                "classify": round(classify_seconds * 1000, 3),
+                "apply": round((applied - classified) * 1000, 3),
+            },
+        }
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    @_on_shard
+    def maintain(
+        self, retention_days: int = ARCHIVE_RETENTION_DAYS, vacuum: bool = True
+    ) -> Dict[str, object]:
+        started = time.perf_counter()
+        # Buffered events must reach their tables before the cutoff is applied.
+        writer.flush()
+        archived = storage.archive_events(retention_days)
+        packed = time.perf_counter()
+        compaction = storage.compact_database() if vacuum else None
+        compacted = time.perf_counter()
+        return {
+            "retention_days": retention_days,
+            "archived": archived,
+            "compaction": compaction,
+            "timings_ms": {
+                "archive": round((packed - started) * 1000, 3),
+                "compact": round((compacted - packed) * 1000, 3),
+            },
+        }
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+    @_on_shard
+    def search(
+        self, query: str, kind: Optional[str] = None, limit: int = 10, raw: bool = False
+    ) -> Dict[str, object]:
+        match = query if raw else storage.fts_query(query)
+        tables = [transfer.KINDS[kind]] if kind else list(transfer.KINDS.values())
+        rows = storage.search(match, tables, limit=limit) if match else []
+        return {
+            "query": query,
+            "results": [
+                {
+                    "kind": "task" if row["source"] == "tasks" else "loop",
+                    "id": row["id"],
+                    "description": row["description"],
+                    "status": row["status"],
+                    "snippet": row["snippet"],
+                    "score": round(row["score"], 4),
+                }
+                for row in rows
+            ],
+        }
+
+    @_on_shard
+    def dedupe(
+        self,
+        action: Optional[str] = None,
+        threshold: float = DUPLICATE_THRESHOLD,
+        limit: int = 20,
+    ) -> Dict[str, object]:
+        """Cluster near-duplicate active tasks; ``action`` "close" or "merge" applies it.
+
+        The oldest task of each cluster is kept. Without an action nothing
+        changes. The largest ``limit`` clusters are listed with up to ten of
+        their duplicates each.
+        """
+
+        if action not in (None, "close", "merge"):
+            raise ValueError(f"Unknown dedupe action: {action}")
+        started = time.perf_counter()
+        signed = dedupe.refresh_signatures()
+        hashed = time.perf_counter()
+        clusters = dedupe.find_clusters(threshold)
+        clustered = time.perf_counter()
+        # Read the listed tasks first: merging deletes the duplicates.
+        shown = [task_id for members in clusters[:limit] for task_id in members[:11]]
+        descriptions = storage.fetch_task_descriptions(shown)
+        retired = dedupe.resolve(clusters, merge=action == "merge") if action else 0
+        if action:
+            storage.record_activity("dedupe", {"action": action, "clusters": len(clusters), "retired": retired})
+        resolved = time.perf_counter()
+        return {
+            "threshold": threshold,
+            "action": action or "report",
+            "clusters": len(clusters),
+            "duplicates": sum(len(members) - 1 for members in clusters),
+            "retired": retired,
+            "largest": [
+                {
+                    "size": len(members),
+                    "keep": {"id": members[0], "description": descriptions.get(members[0])},
+                    "duplicates": [
+                        {"id": task_id, "description": descriptions.get(task_id)} for task_id in members[1:11]
+                    ],
+                }
+                for members in clusters[:limit]
+            ],
+            "timings_ms": {
+                "sign": round((hashed - started) * 1000, 3),
+                "cluster": round((clustered - hashed) * 1000, 3),
+                "resolve": round((resolved - clustered) * 1000, 3),
+            },
+            "signed": signed,
+        }
+
+    # ------------------------------------------------------------------
+    # Bulk import / export
+    # ------------------------------------------------------------------
+    @_on_shard
+    def import_records(
+        self,
+        kind: str,
+        records: Iterable[Mapping[str, Any]],
+        chunk_size: int = storage.IMPORT_CHUNK_SIZE,
+        defer_indexes: bool = False,
+    ) -> Dict[str, object]:
+        started = time.perf_counter()
+        imported = transfer.import_records(
+            kind,
+            records,
+            self._score_description,
+            chunk_size=chunk_size,
+            defer_indexes=defer_indexes,
+        )
+        return {
+            "kind": kind,
+            "imported": imported,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
         }
 
+    @_on_shard
+    def export_records(self, kind: str, out: TextIO, fmt: str = "jsonl") -> int:
+        return transfer.export_records(kind, out, fmt)
@@ -0,0 +1,142 @@
+"""Async counterparts of the ``poa.storage`` functions.
+
+Each coroutine runs its blocking twin on a dedicated thread pool, leaving
+the event loop free while SQLite works. The caller's context is copied into
+the worker, so a ``storage.use_database`` block (a user's shard) around the
+``await`` routes the call as it would synchronously. Streaming ``iter_*``
+functions have no counterpart: their cursors belong to the thread that
+opened them. Use the ``fetch_*`` variants instead.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from . import storage
+from .config import ASYNC_STORAGE_WORKERS
+
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def executor() -> ThreadPoolExecutor:
+    """Return the storage thread pool, creating it on first use."""
+
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=ASYNC_STORAGE_WORKERS, thread_name_prefix="poa-storage"
+            )
+        return _executor
+
+
+def shutdown() -> None:
+    """Stop the storage thread pool; the next call starts a fresh one."""
+
+    global _executor
+    with _executor_lock:
+        pool, _executor = _executor, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+async def run(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run ``func(*args, **kwargs)`` on the storage pool in the caller's context."""
+
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor(), functools.partial(context.run, func, *args, **kwargs))
+
+
+def _counterpart(func: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        return await run(func, *args, **kwargs)
+
+    return wrapper
+
+
+add_focus_session = _counterpart(storage.add_focus_session)
+apply_open_loop_actions = _counterpart(storage.apply_open_loop_actions)
+archive_events = _counterpart(storage.archive_events)
+bulk_insert = _counterpart(storage.bulk_insert)
+cached_git_head = _counterpart(storage.cached_git_head)
+close_open_loop = _counterpart(storage.close_open_loop)
+compact_database = _counterpart(storage.compact_database)
+delete_open_loop = _counterpart(storage.delete_open_loop)
+energy_ema = _counterpart(storage.energy_ema)
+fetch_chore_task = _counterpart(storage.fetch_chore_task)
+fetch_energy_rollups = _counterpart(storage.fetch_energy_rollups)
+fetch_git_commits = _counterpart(storage.fetch_git_commits)
+fetch_ignorable_tasks = _counterpart(storage.fetch_ignorable_tasks)
+fetch_open_loops = _counterpart(storage.fetch_open_loops)
+fetch_planned_tasks = _counterpart(storage.fetch_planned_tasks)
+fetch_recent_energy = _counterpart(storage.fetch_recent_energy)
+fetch_task_descriptions = _counterpart(storage.fetch_task_descriptions)
+fetch_tasks = _counterpart(storage.fetch_tasks)
+fetch_top_task = _counterpart(storage.fetch_top_task)
+is_seeded = _counterpart(storage.is_seeded)
+last_focus_session = _counterpart(storage.last_focus_session)
+log_energy = _counterpart(storage.log_energy)
+prune_energy_events = _counterpart(storage.prune_energy_events)
+recent_energy_stats = _counterpart(storage.recent_energy_stats)
+record_activity = _counterpart(storage.record_activity)
+reopen_open_loop = _counterpart(storage.reopen_open_loop)
+resolve_duplicate_tasks = _counterpart(storage.resolve_duplicate_tasks)
+schema_version = _counterpart(storage.schema_version)
+search = _counterpart(storage.search)
+seed_defaults = _counterpart(storage.seed_defaults)
+setup_database = _counterpart(storage.setup_database)
+similar_tasks = _counterpart(storage.similar_tasks)
+store_git_commits = _counterpart(storage.store_git_commits)
+update_task_status = _counterpart(storage.update_task_status)
+
+
+__all__ = [
+    "add_focus_session",
+    "apply_open_loop_actions",
+    "archive_events",
+    "bulk_insert",
+    "cached_git_head",
+    "close_open_loop",
+    "compact_database",
+    "delete_open_loop",
+    "energy_ema",
+    "executor",
+    "fetch_chore_task",
+    "fetch_energy_rollups",
+    "fetch_git_commits",
+    "fetch_ignorable_tasks",
+    "fetch_open_loops",
+    "fetch_planned_tasks",
+    "fetch_recent_energy",
+    "fetch_task_descriptions",
+    "fetch_tasks",
+    "fetch_top_task",
+    "is_seeded",
+    "last_focus_session",
+    "log_energy",
+    "prune_energy_events",
+    "recent_energy_stats",
+    "record_activity",
+    "reopen_open_loop",
+    "resolve_duplicate_tasks",
+    "run",
+    "schema_version",
+    "search",
+    "seed_defaults",
+    "setup_database",
+    "shutdown",
+    "similar_tasks",
+    "store_git_commits",
+    "update_task_status",
+]
@@ -0,0 +1,121 @@
+"""Streaming batch evaluation for large task backlogs."""
+
+from __future__ import annotations
+
+import json
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from .assistant import PersonalOpsAssistant
+
+
+_worker_assistant: Optional[PersonalOpsAssistant] = None
+
+
+def iter_descriptions(stream: TextIO) -> Iterator[str]:
+    """Yield task descriptions from plain lines or JSONL records.
+
+    A JSON object line contributes its ``description`` (or ``title``) field,
+    a JSON string line its value; anything else is taken verbatim.
+    """
+
+    for line in stream:
+        text = line.strip()
+        if not text:
+            continue
+        if text[0] in "{\"":
+            try:
+                record = json.loads(text)
+            except ValueError:
+                # Plain text that happens to open with a quote or brace.
+                yield text
+                continue
+            if isinstance(record, dict):
+                record = record.get("description", record.get("title"))
+            if not isinstance(record, str):
+                raise ValueError(f"No task description in batch record: {text[:80]}")
+            text = record
+        yield text
+
+
+def _chunks(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _init_worker(assistant: PersonalOpsAssistant) -> None:
+    global _worker_assistant
+    _worker_assistant = assistant
+
+
+def _evaluate_chunk(descriptions: List[str]) -> List[Dict[str, object]]:
+    return [_worker_assistant.evaluate_task(description) for description in descriptions]
+
+
+def evaluate_stream(
+    assistant: PersonalOpsAssistant,
+    descriptions: Iterable[str],
+    workers: int = 1,
+    chunk_size: int = 1000,
+) -> Iterator[Dict[str, object]]:
+    """Evaluate descriptions lazily, preserving input order.
+
+    With ``workers > 1`` chunks are fanned out to a process pool, keeping at
+    most two chunks per worker in flight so memory stays bounded.
+    """
+
+    if workers <= 1:
+        for description in descriptions:
+            yield assistant.evaluate_task(description)
+        return
+
+    pending: Deque[Future] = deque()
+    # The assistant is pickled into each worker without re-running __init__,
+    # so workers skip the database setup entirely.
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(assistant,),
+    ) as pool:
+        for chunk in _chunks(descriptions, chunk_size):
+            pending.append(pool.submit(_evaluate_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _morning_brief_for(user: str) -> Tuple[str, Optional[Dict[str, object]], Optional[str]]:
+    # One user's broken shard must not sink everyone else's brief.
+    try:
+        return user, PersonalOpsAssistant(user=user).morning_brief(), None
+    except Exception as exc:
+        return user, None, f"{type(exc).__name__}: {exc}"
+
+
+def morning_briefs(
+    users: Iterable[str],
+    workers: int = 1,
+    chunk_size: int = 8,
+) -> Iterator[Tuple[str, Optional[Dict[str, object]], Optional[str]]]:
+    """Build each user's morning brief from their own shard, in input order.
+
+    Yields ``(user, brief, error)`` with exactly one of ``brief`` and
+    ``error`` set. Shards are independent files, so with ``workers > 1``
+    users are spread over a process pool without any write contention.
+    """
+
+    if workers <= 1:
+        yield from map(_morning_brief_for, users)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_morning_brief_for, users, chunksize=chunk_size)
+
+
+__all__ = ["evaluate_stream", "iter_descriptions", "morning_briefs"]
@@ -0,0 +1,138 @@
+"""Bounded LRU cache for query results, validated by table change counters.
+
+Entries remember the change counters of the tables they were computed from
+(see ``storage.change_versions``); a lookup with different counters is a
+miss, so a cached result never outlives a write, whichever process made it.
+Eviction is least recently used, bounded by both entry count and an
+estimate of the memory the results hold.
+"""
+
+from __future__ import annotations
+
+import copy
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+
+# Returned by ``ResultCache.get`` on a miss; ``None`` is a valid result.
+MISSING = object()
+
+# Containers longer than this are sized from a sample of their items.
+_SAMPLE = 32
+
+
+def estimate_size(value: Any) -> int:
+    """Rough deep size of ``value`` in bytes; long containers are sampled."""
+
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        items = list(value.items())
+        sample = items[:_SAMPLE]
+        if not sample:
+            return size
+        inner = sum(estimate_size(key) + estimate_size(item) for key, item in sample)
+        return size + inner * len(items) // len(sample)
+    try:
+        length = len(value)
+    except TypeError:
+        return size
+    if not length:
+        return size
+    sample = [value[index] for index in range(min(length, _SAMPLE))]
+    inner = sum(estimate_size(item) for item in sample)
+    return size + inner * length // len(sample)
+
+
+def _detach(value: Any) -> Any:
+    # Callers may mutate what they get back; the cached copy must not change.
+    # Lists of rows only need a new list, rows themselves are immutable.
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return copy.deepcopy(value)
+    return value
+
+
+class ResultCache:
+    """Thread-safe LRU of ``key -> (versions, value)`` with a memory bound."""
+
+    def __init__(self, max_bytes: int, max_entries: int) -> None:
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple[int, ...], Any, int]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, versions: Tuple[int, ...]) -> Any:
+        """Return a copy of the value cached under ``versions``, else ``MISSING``."""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != versions:
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        return _detach(value)
+
+    def put(self, key: Hashable, versions: Tuple[int, ...], value: Any) -> None:
+        """Store ``value``; results larger than the whole budget are not kept."""
+
+        size = estimate_size(value)
+        value = _detach(value)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[2]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (versions, value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def prometheus(stats: Dict[str, int]) -> str:
+    """Render ``ResultCache.stats()`` in the Prometheus text exposition format."""
+
+    lines = []
+    for key, kind, help_text in (
+        ("entries", "gauge", "Results held by the result cache."),
+        ("bytes", "gauge", "Estimated bytes held by the result cache."),
+        ("max_bytes", "gauge", "Memory bound of the result cache."),
+        ("hits", "counter", "Result cache lookups answered from memory."),
+        ("misses", "counter", "Result cache lookups that ran the query."),
+        ("evictions", "counter", "Results evicted to stay within the bounds."),
+    ):
+        name = f"poa_result_cache_{key}" + ("_total" if kind == "counter" else "")
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {stats[key]}"]
+    return "\n".join(lines) + "\n"
+
+
+__all__ = ["MISSING", "ResultCache", "estimate_size", "prometheus"]
@@ -4,26 +4,228 @@ from __future__ import annotations
 
 import argparse
 import json
-from typing import Any, Dict
+import os
+import sys
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Any, Callable, ContextManager, Dict
 
-from .assistant import PersonalOpsAssistant
+from . import daemon
+
+if TYPE_CHECKING:
+    from .assistant import PersonalOpsAssistant
+
+# Commands a running ``poa serve`` daemon can answer. Everything else, and
+# the fallback when no daemon is listening, imports the assistant lazily.
+DAEMON_COMMANDS = (
+    "morning",
+    "evaluate",
+    "focus",
+    "decide",
+    "energy",
+    "weekly",
+    "ob1",
+    "load",
+    "search",
+    "dashboard",
+    "schedule",
+)
+# Dispatched through the same command table but always run in-process:
+# on a large backlog or database (dedupe, VACUUM) they can outlast the
+# daemon client's timeout.
+LOCAL_COMMANDS = ("dedupe", "maintain")
+
+
+def _positive_int(text: str) -> int:
+    """argparse type for counts that must be at least 1."""
+
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {text!r}") from None
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def _similarity(text: str) -> float:
+    """argparse type for similarity thresholds, in (0, 1]."""
+
+    try:
+        value = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid float value: {text!r}") from None
+    if not 0 < value <= 1:
+        raise argparse.ArgumentTypeError(f"must be above 0 and at most 1, got {value}")
+    return value
+
+
+def _user_id(text: str) -> str:
+    """argparse type for ``--user``: an ID ``storage.shard_path`` accepts."""
+
+    # Imported here: most commands go to the daemon and never need storage.
+    from .storage import shard_path
+
+    try:
+        shard_path(text)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc)) from None
+    return text
 
 
 def _render(data: Dict[str, Any]) -> str:
     return json.dumps(data, indent=2, ensure_ascii=False)
 
 
+def _run_all_users(args: argparse.Namespace) -> int:
+    from .batch import morning_briefs
+    from .storage import list_users
+
+    failed = False
+    write = sys.stdout.write
+    for user, brief, error in morning_briefs(list_users(), workers=args.workers):
+        record: Dict[str, Any] = {"user": user}
+        if error is None:
+            record["brief"] = brief
+        else:
+            record["error"] = error
+            failed = True
+        write(json.dumps(record, ensure_ascii=False))
+        write("\n")
+    return 1 if failed else 0
+
+
+def _run_import(assistant: "PersonalOpsAssistant", args: argparse.Namespace) -> int:
+    from .transfer import detect_format, read_records
+
+    fmt = args.format or detect_format(args.file)
+    try:
+        source = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8", newline="")
+    except OSError as exc:
+        print(f"poa: {exc}", file=sys.stderr)
+        return 1
+    try:
+        result = assistant.import_records(
+            args.kind,
+            read_records(source, fmt),
+            chunk_size=args.chunk_size,
+            defer_indexes=args.defer_indexes,
+        )
+    except ValueError as exc:
+        # Bad records: a missing description, a metric that is not a number.
+        print(f"poa: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    print(_render(result))
+    return 0
+
+
+def _run_export(assistant: "PersonalOpsAssistant", args: argparse.Namespace) -> int:
+    from .transfer import detect_format
+
+    fmt = args.format or detect_format(args.output)
+    out = sys.stdout if args.output in (None, "-") else open(args.output, "w", encoding="utf-8", newline="")
+    try:
+        assistant.export_records(args.kind, out, fmt)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def _run_batch(assistant: "PersonalOpsAssistant", args: argparse.Namespace) -> int:
+    from .batch import evaluate_stream, iter_descriptions
+
+    try:
+        source = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+    except OSError as exc:
+        print(f"poa: {exc}", file=sys.stderr)
+        return 1
+    try:
+        results = evaluate_stream(
+            assistant,
+            iter_descriptions(source),
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+        )
+        write = sys.stdout.write
+        for result in results:
+            write(json.dumps(result, ensure_ascii=False))
+            write("\n")
+    except ValueError as exc:
+        # A JSON record without a description; earlier results are already out.
+        sys.stdout.flush()
+        print(f"poa: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    return 0
+
+
 def main(argv: list[str] | None = None) -> int:
     parser = argparse.ArgumentParser(
         prog="poa",
         description="Personal Operations Assistant – zero pleasantries, pure execution.",
     )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Run in-process even if a 'poa serve' daemon is running",
+    )
+    parser.add_argument(
+        "--user",
+        type=_user_id,
+        default=os.environ.get("POA_USER") or None,
+        help="Use this user's database shard (default: $POA_USER, else the shared database)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Run in-process and print phase, SQL and subprocess timings to stderr",
+    )
+    parser.add_argument(
+        "--profile-output",
+        metavar="FILE",
+        help="Also write a cProfile dump to FILE (implies --profile)",
+    )
     subparsers = parser.add_subparsers(dest="command", required=True)
 
-    subparsers.add_parser("morning", help="Deliver the brutal morning brief")
+    morning_parser = subparsers.add_parser("morning", help="Deliver the brutal morning brief")
+    morning_parser.add_argument(
+        "--all-users",
+        action="store_true",
+        help="Brief every user with a shard; emits one NDJSON line per user",
+    )
+    morning_parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for --all-users (default: CPU count)",
+    )
 
     evaluate_parser = subparsers.add_parser("evaluate", help="Score a task against your brain chemistry")
-    evaluate_parser.add_argument("description", help="Task description to evaluate")
+    evaluate_parser.add_argument("description", nargs="?", help="Task description to evaluate")
+    evaluate_parser.add_argument(
+        "--duplicates",
+        action="store_true",
+        help="Also list existing tasks that nearly match the description",
+    )
+    evaluate_parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="Evaluate one description per line (plain or JSONL) from FILE or '-' for stdin; emits NDJSON",
+    )
+    evaluate_parser.add_argument(
+        "--workers", type=_positive_int, default=1, help="Worker processes for --batch (default: 1)"
+    )
+    evaluate_parser.add_argument(
+        "--chunk-size",
+        type=_positive_int,
+        default=1000,
+        help="Descriptions per worker chunk (default: 1000)",
+    )
 
     subparsers.add_parser("focus", help="Trigger the focus protector rituals")
 
@@ -33,32 +235,216 @@ def main(argv: list[str] | None = None) -> int:
     subparsers.add_parser("energy", help="Check current energy and recommended usage")
     subparsers.add_parser("weekly", help="Run the weekly reality check")
     subparsers.add_parser("ob1", help="Get the OB1 focus briefing")
-    subparsers.add_parser("load", help="Engage the cognitive load manager")
+    load_parser = subparsers.add_parser("load", help="Engage the cognitive load manager")
+    load_parser.add_argument(
+        "--dry-run", action="store_true", help="Classify open loops without closing or deleting any"
+    )
+    subparsers.add_parser(
+        "dashboard", help="Morning, energy, load (dry run) and weekly at once, as one JSON document"
+    )
+    schedule_parser = subparsers.add_parser(
+        "schedule", help="Plan focus blocks for the week, matching task demand to your energy curve"
+    )
+    schedule_parser.add_argument(
+        "--days", type=_positive_int, default=7, help="Days to plan ahead (default: 7)"
+    )
+    maintain_parser = subparsers.add_parser(
+        "maintain", help="Archive old events, release free pages and refresh statistics"
+    )
+    maintain_parser.add_argument(
+        "--days",
+        type=_positive_int,
+        default=None,
+        help="Archive activity, energy and focus rows older than this many days (default: 90)",
+    )
+    maintain_parser.add_argument(
+        "--no-vacuum", action="store_true", help="Archive only; skip vacuum and ANALYZE"
+    )
+    search_parser = subparsers.add_parser("search", help="Full-text search over tasks and open loops")
+    search_parser.add_argument("query", help="Words to look for (all must match)")
+    search_parser.add_argument("--kind", choices=("tasks", "loops"), help="Only search one kind")
+    search_parser.add_argument("--limit", type=int, default=10, help="Results to show (default: 10)")
+    search_parser.add_argument(
+        "--raw", action="store_true", help="Pass the query to FTS5 as-is (phrases, OR, NEAR, prefix*)"
+    )
+    dedupe_parser = subparsers.add_parser(
+        "dedupe", help="Find near-duplicate tasks and optionally close or merge them"
+    )
+    dedupe_action = dedupe_parser.add_mutually_exclusive_group()
+    dedupe_action.add_argument(
+        "--close",
+        dest="action",
+        action="store_const",
+        const="close",
+        help="Mark every duplicate done, keeping the oldest task of each cluster",
+    )
+    dedupe_action.add_argument(
+        "--merge",
+        dest="action",
+        action="store_const",
+        const="merge",
+        help="Delete duplicates after folding their plan flag and age into the oldest task",
+    )
+    dedupe_parser.add_argument(
+        "--threshold",
+        type=_similarity,
+        default=None,
+        help="Token Jaccard needed to count as a duplicate (default: 0.6)",
+    )
+    dedupe_parser.add_argument("--limit", type=int, default=20, help="Clusters to list (default: 20)")
+
+    import_parser = subparsers.add_parser("import", help="Bulk-load tasks or open loops from CSV/JSONL")
+    import_parser.add_argument("kind", choices=("tasks", "loops"))
+    import_parser.add_argument("file", help="CSV or JSONL file, or '-' for stdin")
+    import_parser.add_argument(
+        "--format", choices=("csv", "jsonl"), help="Input format (default: from the extension, else jsonl)"
+    )
+    import_parser.add_argument(
+        "--chunk-size",
+        type=_positive_int,
+        default=10000,
+        help="Rows per executemany call (default: 10000)",
+    )
+    import_parser.add_argument(
+        "--defer-indexes",
+        action="store_true",
+        help="Drop the table's indexes during the load and rebuild them once at the end",
+    )
+
+    export_parser = subparsers.add_parser("export", help="Stream tasks or open loops as CSV/JSONL")
+    export_parser.add_argument("kind", choices=("tasks", "loops"))
+    export_parser.add_argument("--format", choices=("csv", "jsonl"), help="Output format (default: jsonl)")
+    export_parser.add_argument("--output", "-o", help="Write to this file instead of stdout")
+
+    subparsers.add_parser("serve", help="Run a resident assistant answering on a Unix socket")
+    subparsers.add_parser(
+        "metrics", help="Print a profiling daemon's counters in Prometheus text format"
+    )
 
     args = parser.parse_args(argv)
+    if args.command == "evaluate" and (args.description is None) == (args.batch is None):
+        parser.error("evaluate needs either a description or --batch FILE")
 
-    assistant = PersonalOpsAssistant()
-    if args.command == "morning":
-        result = assistant.morning_brief()
-    elif args.command == "evaluate":
-        result = assistant.evaluate_task(args.description)
-    elif args.command == "focus":
-        result = assistant.focus_protector()
-    elif args.command == "decide":
-        result = assistant.decide(args.question)
-    elif args.command == "energy":
-        result = assistant.energy_tracker()
-    elif args.command == "weekly":
-        result = assistant.weekly_reality_check()
-    elif args.command == "ob1":
-        result = assistant.ob1_focus()
-    elif args.command == "load":
-        result = assistant.cognitive_load_manager()
-    else:
+    if args.command == "serve":
+        daemon.serve(profile=args.profile)
+        return 0
+
+    if args.command == "metrics":
+        return _print_metrics()
+
+    if args.profile or args.profile_output:
+        return _run_profiled(parser, args)
+    return _dispatch(parser, args, lambda name: nullcontext())
+
+
+def _print_metrics() -> int:
+    response = daemon.request("metrics", {})
+    if response is None:
+        print("poa: no daemon is running; start one with 'poa --profile serve'", file=sys.stderr)
+        return 1
+    if not response["ok"]:
+        print(f"poa: daemon error: {response['error']}", file=sys.stderr)
+        return 1
+    if not response["result"]["enabled"]:
+        print("poa: the daemon was started without 'poa --profile serve'", file=sys.stderr)
+        return 1
+    sys.stdout.write(response["result"]["text"])
+    return 0
+
+
+def _run_profiled(parser: argparse.ArgumentParser, args: argparse.Namespace) -> int:
+    """Run one command in-process with instrumentation; report to stderr."""
+
+    from . import profiling
+
+    profiler = profiling.enable()
+    # Profile the work itself rather than a round trip to the daemon.
+    args.no_daemon = True
+    collector = None
+    if args.profile_output:
+        import cProfile
+
+        collector = cProfile.Profile()
+        collector.enable()
+    try:
+        return _dispatch(parser, args, profiling.phase)
+    finally:
+        if collector is not None:
+            collector.disable()
+            collector.dump_stats(args.profile_output)
+        print(_render({"profile": profiler.report()}), file=sys.stderr)
+
+
+def _dispatch(
+    parser: argparse.ArgumentParser,
+    args: argparse.Namespace,
+    phase: Callable[[str], ContextManager[None]],
+) -> int:
+    if args.command == "morning" and args.all_users:
+        with phase("command:morning"):
+            return _run_all_users(args)
+
+    if args.command in ("import", "export"):
+        with phase("import"):
+            from .assistant import PersonalOpsAssistant
+        with phase("setup"):
+            assistant = PersonalOpsAssistant(user=args.user)
+        with phase(f"command:{args.command}"):
+            if args.command == "import":
+                return _run_import(assistant, args)
+            return _run_export(assistant, args)
+
+    if args.command == "evaluate" and args.batch is not None:
+        with phase("import"):
+            from .assistant import PersonalOpsAssistant
+        with phase("setup"):
+            assistant = PersonalOpsAssistant(user=args.user)
+        with phase("command:evaluate"):
+            return _run_batch(assistant, args)
+
+    if args.command not in DAEMON_COMMANDS + LOCAL_COMMANDS:
         parser.error("Unknown command")
         return 1
+    params = {
+        key: value
+        for key, value in vars(args).items()
+        if key
+        not in {
+            "command",
+            "no_daemon",
+            "profile",
+            "profile_output",
+            "batch",
+            "workers",
+            "chunk_size",
+            "all_users",
+        }
+    }
+    params["cwd"] = os.getcwd()
 
-    print(_render(result))
+    local = args.no_daemon or args.command in LOCAL_COMMANDS
+    response = None if local else daemon.request(args.command, params)
+    if response is None:
+        with phase("import"):
+            from .assistant import PersonalOpsAssistant
+            from .commands import run_command
+            from .storage import InvalidSearchQuery
+        with phase("setup"):
+            assistant = PersonalOpsAssistant(user=args.user)
+        with phase(f"command:{args.command}"):
+            try:
+                result = run_command(assistant, args.command, params)
+            except InvalidSearchQuery as exc:
+                print(f"poa: {exc}", file=sys.stderr)
+                return 1
+    elif response["ok"]:
+        result = response["result"]
+    else:
+        print(f"poa: daemon error: {response['error']}", file=sys.stderr)
+        return 1
+
+    with phase("render"):
+        print(_render(result))
     return 0
 
 
@@ -0,0 +1,94 @@
+"""Dispatch table shared by the CLI and the resident daemon."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping
+
+from . import profiling, storage
+from .assistant import PersonalOpsAssistant
+from .cache import prometheus
+
+
+Handler = Callable[[PersonalOpsAssistant, Mapping[str, Any]], Dict[str, object]]
+
+
+def _weekly(assistant: PersonalOpsAssistant, params: Mapping[str, Any]) -> Dict[str, object]:
+    cwd = params.get("cwd")
+    return assistant.weekly_reality_check(cwd=Path(cwd) if cwd else None)
+
+
+def _dashboard(assistant: PersonalOpsAssistant, params: Mapping[str, Any]) -> Dict[str, object]:
+    cwd = params.get("cwd")
+    return assistant.dashboard(cwd=Path(cwd) if cwd else None)
+
+
+def _maintain(assistant: PersonalOpsAssistant, params: Mapping[str, Any]) -> Dict[str, object]:
+    days = params.get("days")
+    options: Dict[str, Any] = {"vacuum": not params.get("no_vacuum", False)}
+    if days is not None:
+        options["retention_days"] = int(days)
+    return assistant.maintain(**options)
+
+
+def _metrics(assistant: PersonalOpsAssistant, params: Mapping[str, Any]) -> Dict[str, object]:
+    profiler = profiling.active()
+    if profiler is None:
+        return {"enabled": False, "text": ""}
+    return {"enabled": True, "text": profiler.prometheus() + prometheus(storage.result_cache_stats())}
+
+
+def _dedupe(assistant: PersonalOpsAssistant, params: Mapping[str, Any]) -> Dict[str, object]:
+    options: Dict[str, Any] = {"action": params.get("action")}
+    if params.get("limit") is not None:
+        options["limit"] = int(params["limit"])
+    if params.get("threshold") is not None:
+        options["threshold"] = float(params["threshold"])
+    return assistant.dedupe(**options)
+
+
+def _schedule(assistant: PersonalOpsAssistant, params: Mapping[str, Any]) -> Dict[str, object]:
+    days = params.get("days")
+    return assistant.schedule(days=int(days)) if days is not None else assistant.schedule()
+
+
+COMMANDS: Dict[str, Handler] = {
+    "morning": lambda assistant, params: assistant.morning_brief(),
+    "evaluate": lambda assistant, params: assistant.evaluate_task(
+        params["description"], check_duplicates=bool(params.get("duplicates", False))
+    ),
+    "focus": lambda assistant, params: assistant.focus_protector(),
+    "decide": lambda assistant, params: assistant.decide(params["question"]),
+    "energy": lambda assistant, params: assistant.energy_tracker(),
+    "weekly": _weekly,
+    "ob1": lambda assistant, params: assistant.ob1_focus(),
+    "load": lambda assistant, params: assistant.cognitive_load_manager(
+        dry_run=bool(params.get("dry_run", False))
+    ),
+    "dashboard": _dashboard,
+    "maintain": _maintain,
+    "dedupe": _dedupe,
+    "schedule": _schedule,
+    "metrics": _metrics,
+    "search": lambda assistant, params: assistant.search(
+        params["query"],
+        kind=params.get("kind"),
+        limit=int(params.get("limit") or 10),
+        raw=bool(params.get("raw", False)),
+    ),
+}
+
+
+def run_command(
+    assistant: PersonalOpsAssistant, command: str, params: Mapping[str, Any]
+) -> Dict[str, object]:
+    """Run one named assistant command with JSON-style parameters."""
+
+    try:
+        handler = COMMANDS[command]
+    except KeyError:
+        raise ValueError(f"Unknown command: {command}") from None
+    return handler(assistant, params)
+
+
+__all__ = ["COMMANDS", "run_command"]
@@ -2,14 +2,92 @@
 
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass
 from pathlib import Path
 from random import random
 from typing import Callable, Dict, List
 
 
-DATA_DIR = Path(__file__).resolve().parent / "data"
+# POA_DATA_DIR relocates the database and socket, e.g. for isolated benchmarks.
+DATA_DIR = Path(os.environ.get("POA_DATA_DIR") or Path(__file__).resolve().parent / "data")
 DB_PATH = DATA_DIR / "poa.db"
+SOCKET_PATH = DATA_DIR / "poa.sock"
+# Per-user databases for PersonalOpsAssistant(user=...); see storage.shard_path.
+SHARD_DIR = Path(os.environ.get("POA_SHARD_DIR") or DATA_DIR / "users")
+# Pooled connections kept open per thread before idle ones are closed.
+MAX_POOLED_CONNECTIONS = 16
+
+# Applied to every pooled connection. WAL lets readers run alongside the
+# writer, and NORMAL sync is durable across application crashes in WAL mode.
+SQLITE_PRAGMAS: Dict[str, object] = {
+    # Only takes effect on a new database; older ones are converted by the
+    # first ``poa maintain``.
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "cache_size": -16000,  # KiB, i.e. ~16 MB of page cache
+    "mmap_size": 268435456,  # 256 MB
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+}
+
+# Share of a planned task's tokens that must appear in a commit message for
+# the weekly reality check to count it as done.
+MATCH_THRESHOLD = 0.5
+
+# Token overlap (Jaccard) at which evaluate flags an existing task as a
+# near-duplicate; candidates come from the full-text index.
+DUPLICATE_THRESHOLD = 0.6
+
+# Read-through cache for ranked task lists and briefs, checked against
+# per-table change counters on every hit. POA_RESULT_CACHE=0 turns it off.
+RESULT_CACHE = os.environ.get("POA_RESULT_CACHE", "1") != "0"
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+RESULT_CACHE_MAX_ENTRIES = 256
+
+# MinHash signature length for ``poa dedupe`` and how it is cut into LSH
+# bands. 16 bands of 4 rows make pairs above ~0.5 Jaccard likely candidates;
+# changing either value recomputes every stored signature.
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+
+# History pulled into the git commit cache the first time a repository is seen.
+GIT_CACHE_DAYS = 30
+
+# Repositories are scanned concurrently; each git call gets its own deadline.
+REPO_SCAN_WORKERS = 8
+REPO_SCAN_TIMEOUT = 10.0
+
+# Threads behind ``poa.astorage``; each keeps its own pooled connections.
+ASYNC_STORAGE_WORKERS = 4
+
+# Smoothing factor for the energy moving average maintained by SQLite triggers.
+ENERGY_EMA_ALPHA = 0.3
+
+# ``poa schedule`` plans focus blocks of this length between these local
+# hours, shaping the hour-of-day energy curve from this many days of hourly
+# rollups. An hour's default level counts as this many logged samples.
+SCHEDULE_BLOCK_MINUTES = 90
+SCHEDULE_DAY_START = 8
+SCHEDULE_DAY_END = 20
+SCHEDULE_HISTORY_DAYS = 28
+SCHEDULE_PRIOR_SAMPLES = 3
+
+# Buffered event writes (poa.writer): group-commit activity and energy events
+# from a background thread. Always on in the daemon; POA_BUFFERED_WRITES=1
+# enables it for library and hook use.
+BUFFERED_WRITES = os.environ.get("POA_BUFFERED_WRITES", "") == "1"
+WRITE_BATCH_SIZE = 256
+WRITE_FLUSH_INTERVAL = 0.5  # seconds a write may wait for its batch
+WRITE_QUEUE_SIZE = 10000  # pending writes before submitters block
+WRITE_DURABILITY = os.environ.get("POA_WRITE_DURABILITY", "normal")  # off | normal | full
+
+# ``poa maintain`` archives activity, energy and focus rows older than this
+# into zlib-compressed segments of at most ARCHIVE_SEGMENT_ROWS rows.
+ARCHIVE_RETENTION_DAYS = 90
+ARCHIVE_SEGMENT_ROWS = 10000
 
 
 @dataclass
@@ -111,6 +189,8 @@ DEFAULT_OPEN_LOOPS = [
 PROJECTS: Dict[str, Dict[str, object]] = {
     "ob1": {
         "repo": "github.com/tuouser/ob1",
+        # Local checkout scanned by the weekly reality check, if present.
+        "path": os.environ.get("POA_OB1_PATH", str(Path.home() / "code" / "ob1")),
         "priority_algorithm": lambda: "breakthrough" if random() > 0.7 else "maintain",
         "boring_tasks": ["update docs", "respond to users", "fix UI"],
         "stimulating_tasks": [
@@ -129,11 +209,39 @@ def ensure_data_dir() -> None:
 
 
 __all__ = [
+    "ARCHIVE_RETENTION_DAYS",
+    "ARCHIVE_SEGMENT_ROWS",
+    "ASYNC_STORAGE_WORKERS",
+    "BUFFERED_WRITES",
     "DATA_DIR",
     "DB_PATH",
     "DEFAULT_OPEN_LOOPS",
     "DEFAULT_TASKS",
+    "DUPLICATE_THRESHOLD",
+    "ENERGY_EMA_ALPHA",
+    "GIT_CACHE_DAYS",
+    "LSH_BANDS",
+    "MATCH_THRESHOLD",
+    "MAX_POOLED_CONNECTIONS",
+    "MINHASH_PERMUTATIONS",
     "PROJECTS",
+    "RESULT_CACHE",
+    "RESULT_CACHE_MAX_BYTES",
+    "RESULT_CACHE_MAX_ENTRIES",
+    "REPO_SCAN_TIMEOUT",
+    "REPO_SCAN_WORKERS",
+    "SCHEDULE_BLOCK_MINUTES",
+    "SCHEDULE_DAY_END",
+    "SCHEDULE_DAY_START",
+    "SCHEDULE_HISTORY_DAYS",
+    "SCHEDULE_PRIOR_SAMPLES",
+    "SHARD_DIR",
+    "SOCKET_PATH",
+    "SQLITE_PRAGMAS",
     "TaskTemplate",
+    "WRITE_BATCH_SIZE",
+    "WRITE_DURABILITY",
+    "WRITE_FLUSH_INTERVAL",
+    "WRITE_QUEUE_SIZE",
     "ensure_data_dir",
 ]
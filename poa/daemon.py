@@ -0,0 +1,87 @@
+"""Client side of the resident ``poa serve`` daemon on a Unix domain socket.
+
+The protocol is one JSON object per line in each direction. Requests look
+like ``{"command": "energy", "params": {}}``; responses are
+``{"ok": true, "result": {...}}`` or ``{"ok": false, "error": "..."}``.
+
+This module stays free of asyncio, sqlite and the assistant so that ``poa``
+talking to a running daemon starts quickly; the server lives in
+``poa.server``.
+"""
+
+from __future__ import annotations
+
+import json
+import socket
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional
+
+from .config import SOCKET_PATH
+
+
+CLIENT_TIMEOUT = 30.0
+
+
+def daemon_alive(socket_path: Path = SOCKET_PATH) -> bool:
+    """Return whether something accepts connections on ``socket_path``."""
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(1.0)
+            client.connect(str(socket_path))
+        return True
+    except OSError:
+        return False
+
+
+def request(
+    command: str,
+    params: Mapping[str, Any],
+    socket_path: Path = SOCKET_PATH,
+    timeout: float = CLIENT_TIMEOUT,
+) -> Optional[Dict[str, Any]]:
+    """Send one request to a running daemon.
+
+    Returns the decoded response, or ``None`` when no daemon accepts the
+    connection so the caller can fall back to running in-process. Once the
+    request is sent, failures raise ``RuntimeError`` instead: the daemon may
+    already have run the command, and running it again is not safe.
+    """
+
+    if not Path(socket_path).exists():
+        return None
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        try:
+            client.connect(str(socket_path))
+        except OSError:
+            return None
+        payload = {"command": command, "params": dict(params)}
+        try:
+            client.sendall(json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n")
+            with client.makefile("rb") as stream:
+                line = stream.readline()
+        except OSError as exc:
+            raise RuntimeError(f"poa daemon request failed: {exc}") from exc
+    if not line:
+        raise RuntimeError("poa daemon closed the connection without answering")
+    return json.loads(line)
+
+
+def serve(socket_path: Path = SOCKET_PATH, profile: bool = False) -> None:
+    """Run the daemon in the foreground, optionally counting for ``poa metrics``."""
+
+    import asyncio
+
+    if profile:
+        # Enabled before the server import so every connection is traced.
+        from . import profiling
+
+        profiling.enable()
+
+    from .server import AssistantServer
+
+    asyncio.run(AssistantServer(socket_path).serve())
+
+
+__all__ = ["daemon_alive", "request", "serve"]
@@ -0,0 +1,251 @@
+"""Near-duplicate task clustering with MinHash signatures and LSH banding.
+
+Every active task gets a MinHash signature of its stemmed tokens, stored in
+``task_signatures`` so later runs only sign new or edited tasks. Tasks with
+identical token sets are folded together first. The remaining candidates
+whose signatures agree on a whole band land in the same bucket; each band
+is streamed from SQLite sorted by bucket, so pairs come out of one sort per
+band instead of a comparison of every pair. Pairs are confirmed with the
+exact token Jaccard and linked with union-find, and each linked component
+is then cut into clusters around its oldest tasks.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import struct
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from . import storage
+from .config import DUPLICATE_THRESHOLD, LSH_BANDS, MINHASH_PERMUTATIONS
+from .matching import tokenize
+
+# Distinct token sets compared per bucket before the rest of it is skipped.
+MAX_BUCKET_REPRESENTATIVES = 64
+
+_signature_struct = struct.Struct(f">{MINHASH_PERMUTATIONS}I")
+# Recorded with the signatures; a mismatch forces them to be recomputed.
+SCHEME = f"minhash-shake128-{MINHASH_PERMUTATIONS}"
+
+
+@lru_cache(maxsize=65536)
+def _token_hashes(token: str) -> Tuple[int, ...]:
+    # One SHAKE-128 digest stretched to every permutation, 32 bits each.
+    return _signature_struct.unpack(hashlib.shake_128(token.encode("utf-8")).digest(_signature_struct.size))
+
+
+@lru_cache(maxsize=65536)
+def shingles(description: str) -> FrozenSet[str]:
+    """The set a signature summarises: stemmed tokens, else the whole text."""
+
+    return tokenize(description) or frozenset({description.strip().lower()})
+
+
+def signature(description: str) -> bytes:
+    """MinHash signature of ``shingles(description)``, as packed bytes."""
+
+    return _minhash(shingles(description))
+
+
+@lru_cache(maxsize=65536)
+def _minhash(tokens: FrozenSet[str]) -> bytes:
+    hashes = [_token_hashes(token) for token in tokens]
+    if len(hashes) == 1:
+        return _signature_struct.pack(*hashes[0])
+    return _signature_struct.pack(*map(min, *hashes))
+
+
+def jaccard(left: FrozenSet[str], right: FrozenSet[str]) -> float:
+    return len(left & right) / len(left | right)
+
+
+def refresh_signatures(chunk_size: int = storage.IMPORT_CHUNK_SIZE) -> int:
+    """Sign every active task that has no current signature; return the count."""
+
+    storage.reset_signatures(SCHEME)
+    signed = 0
+    after_id = 0
+    while True:
+        rows = storage.fetch_unsigned_tasks(after_id, chunk_size)
+        if not rows:
+            return signed
+        signed += storage.store_signatures((row["id"], signature(row["description"])) for row in rows)
+        after_id = rows[-1]["id"]
+
+
+class UnionFind:
+    """Disjoint sets over task ids; only ids that were joined take memory."""
+
+    def __init__(self) -> None:
+        self.parent: Dict[int, int] = {}
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        root = item
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while item != root:
+            parent[item], item = root, parent[item]
+        return root
+
+    def union(self, left: int, right: int) -> bool:
+        left, right = self.find(left), self.find(right)
+        if left == right:
+            return False
+        # The smaller (older) id becomes the root, and so the kept task.
+        if right < left:
+            left, right = right, left
+        self.parent[right] = left
+        self.parent.setdefault(left, left)
+        return True
+
+    def groups(self) -> Dict[int, List[int]]:
+        clusters: Dict[int, List[int]] = {}
+        for item in self.parent:
+            clusters.setdefault(self.find(item), []).append(item)
+        return clusters
+
+
+def _collapse_exact(sets: UnionFind, chunk_size: int = 10000) -> None:
+    """Join tasks with identical token sets and load one row per set as a candidate.
+
+    Identical sets have identical signatures, so they are adjacent when the
+    tasks are streamed by signature; the oldest task stands for the rest.
+    """
+
+    storage.reset_dedupe_candidates()
+    pending: List[Tuple[int, bytes, str]] = []
+    current: Optional[bytes] = None
+    # Token set -> representative among the rows sharing ``current``.
+    seen: Dict[FrozenSet[str], int] = {}
+    for row in storage.iter_signed_tasks():
+        if row["signature"] != current:
+            current = row["signature"]
+            seen = {}
+        tokens = shingles(row["description"])
+        representative = seen.get(tokens)
+        if representative is not None:
+            sets.union(representative, row["id"])
+            continue
+        seen[tokens] = row["id"]
+        pending.append((row["id"], current, row["description"]))
+        if len(pending) >= chunk_size:
+            storage.add_dedupe_candidates(pending)
+            pending = []
+    storage.add_dedupe_candidates(pending)
+
+
+def _buckets(rows: Iterator) -> Iterator[List[Tuple[int, str]]]:
+    """Group adjacent rows with the same bucket, skipping singletons."""
+
+    bucket: Optional[bytes] = None
+    members: List[Tuple[int, str]] = []
+    for row in rows:
+        if row["bucket"] != bucket:
+            if len(members) > 1:
+                yield members
+            bucket = row["bucket"]
+            members = []
+        members.append((row["id"], row["description"]))
+    if len(members) > 1:
+        yield members
+
+
+def _join_bucket(members: Sequence[Tuple[int, str]], sets: UnionFind, threshold: float) -> None:
+    compared = members[:MAX_BUCKET_REPRESENTATIVES]
+    tokens = [shingles(description) for _, description in members]
+    for position, (task_id, _) in enumerate(members):
+        for other in range(min(position, len(compared))):
+            if jaccard(tokens[position], tokens[other]) >= threshold:
+                sets.union(compared[other][0], task_id)
+
+
+def _split_component(
+    members: List[int], exact: Dict[int, List[int]], threshold: float
+) -> Iterator[List[int]]:
+    """Cut a linked component into clusters whose members all match their oldest task.
+
+    Similarity is not transitive, so a chain of near-duplicates can link
+    tasks that share little. Candidates are taken oldest first; each joins
+    the first (oldest) centre it matches or becomes a centre itself.
+    """
+
+    descriptions = storage.fetch_task_descriptions(members)
+    centres: List[Tuple[int, FrozenSet[str]]] = []
+    by_token: Dict[str, List[int]] = {}
+    clusters: Dict[int, List[int]] = {}
+    for task_id in members:
+        tokens = shingles(descriptions[task_id])
+        positions = sorted({position for token in tokens for position in by_token.get(token, ())})
+        for position in positions:
+            centre, centre_tokens = centres[position]
+            if jaccard(tokens, centre_tokens) >= threshold:
+                clusters[centre] += [task_id, *exact.get(task_id, ())]
+                break
+        else:
+            for token in tokens:
+                by_token.setdefault(token, []).append(len(centres))
+            centres.append((task_id, tokens))
+            clusters[task_id] = [task_id, *exact.get(task_id, ())]
+    for cluster in clusters.values():
+        if len(cluster) > 1:
+            yield sorted(cluster)
+
+
+def find_clusters(threshold: float = DUPLICATE_THRESHOLD, bands: int = LSH_BANDS) -> List[List[int]]:
+    """Return clusters of near-duplicate active task ids, oldest id first.
+
+    Every task in a cluster is at least ``threshold`` similar to the first
+    (kept) one. Signatures must be current (see ``refresh_signatures``).
+    Clusters are ordered largest first.
+    """
+
+    if not 0 < threshold <= 1:
+        # At 0 every pair sharing a bucket would count as a duplicate.
+        raise ValueError(f"threshold must be above 0 and at most 1, got {threshold}")
+    if MINHASH_PERMUTATIONS % bands:
+        raise ValueError(f"{bands} bands do not divide {MINHASH_PERMUTATIONS} permutations")
+    width = _signature_struct.size // bands
+    exact_sets = UnionFind()
+    _collapse_exact(exact_sets)
+    # Representative -> the other tasks with the same token set.
+    exact = {root: sorted(members)[1:] for root, members in exact_sets.groups().items()}
+    del exact_sets
+    linked = UnionFind()
+    for band in range(bands):
+        for members in _buckets(storage.iter_candidate_band(band * width, width)):
+            _join_bucket(members, linked, threshold)
+    components = linked.groups()
+    components.update(
+        (representative, [representative]) for representative in exact if representative not in linked.parent
+    )
+    storage.reset_dedupe_candidates()
+    clusters = [
+        cluster
+        for members in components.values()
+        for cluster in _split_component(sorted(members), exact, threshold)
+    ]
+    clusters.sort(key=lambda members: (-len(members), members[0]))
+    return clusters
+
+
+def resolve(clusters: Iterable[Sequence[int]], merge: bool = False) -> int:
+    """Keep the oldest task of each cluster and close (or merge away) the rest."""
+
+    return storage.resolve_duplicate_tasks(
+        ((members[0], members[1:]) for members in clusters if len(members) > 1), merge=merge
+    )
+
+
+__all__ = [
+    "MAX_BUCKET_REPRESENTATIVES",
+    "SCHEME",
+    "UnionFind",
+    "find_clusters",
+    "jaccard",
+    "refresh_signatures",
+    "resolve",
+    "shingles",
+    "signature",
+]
@@ -0,0 +1,329 @@
+"""Incremental, SQLite-backed cache of git commit history."""
+
+from __future__ import annotations
+
+import asyncio
+import subprocess
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+from . import astorage, profiling, storage
+from .config import GIT_CACHE_DAYS, PROJECTS, REPO_SCAN_TIMEOUT, REPO_SCAN_WORKERS
+
+
+Commit = Tuple[str, str, int, str]
+
+_FIELD_SEPARATOR = "\x1f"
+_LOG_FORMAT = "--pretty=format:%H%x1f%h%x1f%ct%x1f%s"
+
+
+def find_repository(start: Path) -> Optional[Path]:
+    """Return the working tree root containing ``start``, if any."""
+
+    start = start.resolve()
+    for candidate in (start, *start.parents):
+        if (candidate / ".git").exists():
+            return candidate
+    return None
+
+
+def _git_dir(repo: Path) -> Path:
+    git_path = repo / ".git"
+    if git_path.is_file():
+        # Worktrees and submodules point at their real git directory.
+        content = git_path.read_text(encoding="utf-8").strip()
+        if content.startswith("gitdir:"):
+            return (repo / content[len("gitdir:"):].strip()).resolve()
+    return git_path
+
+
+def resolve_head(repo: Path) -> Optional[str]:
+    """Read the commit HEAD points at straight from ``.git``, without git."""
+
+    try:
+        git_dir = _git_dir(repo)
+        head = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+        if not head.startswith("ref:"):
+            return head or None
+        ref = head[len("ref:"):].strip()
+        common_dir = git_dir
+        if (git_dir / "commondir").is_file():
+            common_dir = (git_dir / (git_dir / "commondir").read_text(encoding="utf-8").strip()).resolve()
+        for base in (git_dir, common_dir):
+            ref_file = base / ref
+            if ref_file.is_file():
+                return ref_file.read_text(encoding="utf-8").strip() or None
+        packed = common_dir / "packed-refs"
+        if packed.is_file():
+            for line in packed.read_text(encoding="utf-8").splitlines():
+                parts = line.split(" ", 1)
+                if len(parts) == 2 and parts[1] == ref:
+                    return parts[0]
+    except OSError:
+        return None
+    # Unborn branch: no commits yet.
+    return None
+
+
+def _parse_log(output: str) -> List[Commit]:
+    commits: List[Commit] = []
+    for line in output.splitlines():
+        parts = line.split(_FIELD_SEPARATOR, 3)
+        if len(parts) == 4:
+            full_hash, short_hash, committed_at, subject = parts
+            commits.append((full_hash, short_hash, int(committed_at), subject.strip()))
+    return commits
+
+
+def read_commits(
+    repo: Path, revision_range: Optional[str] = None, timeout: Optional[float] = None
+) -> List[Commit]:
+    """Run ``git log`` over ``revision_range`` or the last ``GIT_CACHE_DAYS`` days.
+
+    Raises ``OSError`` when git is missing and ``subprocess.SubprocessError``
+    when it fails or times out.
+    """
+
+    selector = revision_range or f"--since={GIT_CACHE_DAYS}.days"
+    with profiling.subprocess_timer("git log"):
+        output = subprocess.check_output(
+            ["git", "log", _LOG_FORMAT, selector],
+            cwd=repo,
+            text=True,
+            stderr=subprocess.DEVNULL,
+            timeout=timeout,
+        )
+    return _parse_log(output)
+
+
+async def read_commits_async(
+    repo: Path, revision_range: Optional[str] = None, timeout: Optional[float] = None
+) -> List[Commit]:
+    """``read_commits`` on an asyncio subprocess; raises the same exceptions."""
+
+    command = ["git", "log", _LOG_FORMAT, revision_range or f"--since={GIT_CACHE_DAYS}.days"]
+    with profiling.subprocess_timer("git log"):
+        process = await asyncio.create_subprocess_exec(
+            *command, cwd=repo, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            output, _ = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise subprocess.TimeoutExpired(command, timeout) from None
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, command)
+    return _parse_log(output.decode("utf-8", errors="replace"))
+
+
+def is_ancestor(repo: Path, ancestor: str, timeout: Optional[float] = None) -> bool:
+    """Whether ``ancestor`` is still in HEAD's history (False if git no longer knows it)."""
+
+    with profiling.subprocess_timer("git merge-base"):
+        completed = subprocess.run(
+            ["git", "merge-base", "--is-ancestor", ancestor, "HEAD"],
+            cwd=repo,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=timeout,
+        )
+    return completed.returncode == 0
+
+
+async def is_ancestor_async(repo: Path, ancestor: str, timeout: Optional[float] = None) -> bool:
+    """``is_ancestor`` on an asyncio subprocess."""
+
+    command = ["git", "merge-base", "--is-ancestor", ancestor, "HEAD"]
+    with profiling.subprocess_timer("git merge-base"):
+        process = await asyncio.create_subprocess_exec(
+            *command, cwd=repo, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            returncode = await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise subprocess.TimeoutExpired(command, timeout) from None
+    return returncode == 0
+
+
+def _remaining(deadline: Optional[float], repo: Path) -> Optional[float]:
+    # Seconds left before ``deadline`` (time.monotonic), for the next git call.
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise subprocess.TimeoutExpired(["git", "-C", str(repo)], 0)
+    return left
+
+
+def _collect(
+    repo: Path, cached: Optional[str], timeout: Optional[float]
+) -> Optional[Tuple[str, List[Commit], bool]]:
+    """Read new commits for ``repo`` without touching the database.
+
+    Returns ``(head, commits, replace)``, or ``None`` when the cache is
+    already current (or the repository has no commits) and git was not run.
+    Only commits after the cached head are read, unless that head is no
+    longer in HEAD's history; then the whole window is reread and
+    ``replace`` is set. ``timeout`` bounds all of the repository's git
+    calls together, not each one.
+    """
+
+    head = resolve_head(repo)
+    if head is None or head == cached:
+        return None
+    deadline = None if timeout is None else time.monotonic() + timeout
+    # A reset, rebase or branch switch leaves the old head outside HEAD's
+    # history; its range would miss removed commits, so rebuild the window.
+    if cached and is_ancestor(repo, cached, _remaining(deadline, repo)):
+        try:
+            return head, read_commits(repo, f"{cached}..HEAD", _remaining(deadline, repo)), False
+        except subprocess.CalledProcessError:
+            # The old head vanished (gc) since the check.
+            pass
+    return head, read_commits(repo, timeout=_remaining(deadline, repo)), True
+
+
+def project_repositories(cwd: Path) -> Dict[str, Path]:
+    """Map project names to local repositories: configured ones plus ``cwd``'s.
+
+    ``cwd``'s repository is keyed by its directory name, or by its full
+    path when that name is already a configured project.
+    """
+
+    repos: Dict[str, Path] = {}
+    for name, project in PROJECTS.items():
+        path = project.get("path")
+        if path and (Path(str(path)).expanduser() / ".git").exists():
+            repos[name] = Path(str(path)).expanduser().resolve()
+    current = find_repository(cwd)
+    if current is not None and current not in repos.values():
+        # A checkout named like a configured project must not replace it.
+        repos[str(current) if current.name in repos else current.name] = current
+    return repos
+
+
+def sync_repositories(
+    repos: Dict[str, Path],
+    workers: int = REPO_SCAN_WORKERS,
+    timeout: float = REPO_SCAN_TIMEOUT,
+) -> Dict[str, Optional[str]]:
+    """Sync many repositories concurrently; return an error per failed project.
+
+    git runs on a bounded thread pool with one deadline per repository,
+    shared by its git calls, so the total time tracks the slowest repository. Database access stays on the
+    calling thread.
+    """
+
+    errors: Dict[str, Optional[str]] = {}
+    if not repos:
+        return errors
+    workers = max(1, min(workers, len(repos)))
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {
+            pool.submit(_collect, path, storage.cached_git_head(str(path)), timeout): name
+            for name, path in repos.items()
+        }
+        # Each repository's git calls share one ``timeout``, counted from
+        # when a worker picks it up; repositories beyond ``workers`` queue.
+        # The grace period only covers parsing.
+        rounds = -(-len(repos) // workers)
+        done, not_done = wait(futures, timeout=rounds * timeout + 5)
+        for future in not_done:
+            errors[futures[future]] = "timed out"
+        for future in done:
+            name = futures[future]
+            try:
+                collected = future.result()
+            except subprocess.TimeoutExpired:
+                errors[name] = "timed out"
+                continue
+            except (OSError, subprocess.SubprocessError) as exc:
+                errors[name] = str(exc) or type(exc).__name__
+                continue
+            errors[name] = None
+            if collected is not None:
+                head, commits, replace = collected
+                storage.store_git_commits(str(repos[name]), head, commits, replace=replace)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return errors
+
+
+async def _collect_async(
+    repo: Path, cached: Optional[str], timeout: Optional[float]
+) -> Optional[Tuple[str, List[Commit], bool]]:
+    head = resolve_head(repo)
+    if head is None or head == cached:
+        return None
+    deadline = None if timeout is None else time.monotonic() + timeout
+    if cached and await is_ancestor_async(repo, cached, _remaining(deadline, repo)):
+        try:
+            return head, await read_commits_async(repo, f"{cached}..HEAD", _remaining(deadline, repo)), False
+        except subprocess.CalledProcessError:
+            pass
+    return head, await read_commits_async(repo, timeout=_remaining(deadline, repo)), True
+
+
+async def sync_repositories_async(
+    repos: Dict[str, Path], timeout: float = REPO_SCAN_TIMEOUT
+) -> Dict[str, Optional[str]]:
+    """``sync_repositories`` with every git log running as an asyncio subprocess.
+
+    No thread per repository: all of them are awaited together on the event
+    loop, and cache reads and writes go through ``poa.astorage``.
+    """
+
+    names = list(repos)
+    heads = await asyncio.gather(*(astorage.cached_git_head(str(repos[name])) for name in names))
+    results = await asyncio.gather(
+        *(_collect_async(repos[name], head, timeout) for name, head in zip(names, heads)),
+        return_exceptions=True,
+    )
+    errors: Dict[str, Optional[str]] = {}
+    for name, result in zip(names, results):
+        if isinstance(result, subprocess.TimeoutExpired):
+            errors[name] = "timed out"
+        elif isinstance(result, (OSError, subprocess.SubprocessError)):
+            errors[name] = str(result) or type(result).__name__
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            errors[name] = None
+            if result is not None:
+                head, commits, replace = result
+                await astorage.store_git_commits(str(repos[name]), head, commits, replace=replace)
+    return errors
+
+
+def recent_activity(repos: Dict[str, Path], days: int = 7) -> List[str]:
+    """Return cached commits of all ``repos`` as one stream, newest first.
+
+    Lines read ``"[<project>] <short hash> <subject>"``.
+    """
+
+    names = {str(path): name for name, path in repos.items()}
+    since = int(time.time()) - days * 86400
+    return [
+        f"[{names[row['repo']]}] {row['short_hash']} {row['subject']}"
+        for row in storage.fetch_git_commits(list(names), since)
+    ]
+
+
+__all__ = [
+    "find_repository",
+    "is_ancestor",
+    "is_ancestor_async",
+    "project_repositories",
+    "read_commits",
+    "read_commits_async",
+    "recent_activity",
+    "resolve_head",
+    "sync_repositories",
+    "sync_repositories_async",
+]
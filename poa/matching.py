@@ -0,0 +1,112 @@
+"""Token normalisation and an inverted index for fuzzy text matching."""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+
+STOPWORDS = frozenset(
+    {
+        "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in",
+        "into", "is", "it", "its", "of", "on", "or", "so", "that", "the",
+        "this", "to", "up", "via", "was", "with",
+    }
+)
+
+# Suffix -> replacement, longest first; the first match wins. Identity
+# entries protect endings such as "status" and "class" from the plain "s".
+_SUFFIXES: Tuple[Tuple[str, str], ...] = (
+    ("ational", ""),
+    ("ations", ""),
+    ("ation", ""),
+    ("ating", ""),
+    ("ments", ""),
+    ("ated", ""),
+    ("ates", ""),
+    ("ment", ""),
+    ("ings", ""),
+    ("ing", ""),
+    ("ies", "y"),
+    ("ied", "y"),
+    ("ate", ""),
+    ("ers", ""),
+    ("er", ""),
+    ("ed", ""),
+    ("es", ""),
+    ("ss", "ss"),
+    ("us", "us"),
+    ("s", ""),
+    ("e", ""),
+)
+_MIN_STEM = 3
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    """Strip common English suffixes so inflections share one token."""
+
+    for suffix, replacement in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) + len(replacement) >= _MIN_STEM:
+            return token[: len(token) - len(suffix)] + replacement
+    return token
+
+
+def tokenize(text: str) -> FrozenSet[str]:
+    """Return the distinct normalised, stemmed, non-stopword tokens of ``text``."""
+
+    return frozenset(
+        stem(token) for token in _TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS
+    )
+
+
+def token_forms(text: str) -> Dict[str, List[str]]:
+    """Map each token of ``tokenize(text)`` to the distinct words that stem to it."""
+
+    forms: Dict[str, List[str]] = {}
+    for word in _TOKEN_PATTERN.findall(text.lower()):
+        if word not in STOPWORDS:
+            words = forms.setdefault(stem(word), [])
+            if word not in words:
+                words.append(word)
+    return forms
+
+
+class TokenIndex:
+    """Inverted index from stemmed tokens to the documents containing them."""
+
+    def __init__(self, documents: Iterable[str]) -> None:
+        self.documents: List[str] = []
+        self._postings: Dict[str, List[int]] = {}
+        for position, document in enumerate(documents):
+            self.documents.append(document)
+            for token in tokenize(document):
+                self._postings.setdefault(token, []).append(position)
+
+    def best_match(self, query: str, threshold: float) -> Optional[Tuple[int, float]]:
+        """Return ``(document index, score)`` for the best match of ``query``.
+
+        The score is the share of the query's tokens found in the document;
+        only documents sharing a token are visited. ``None`` when nothing
+        reaches ``threshold``.
+        """
+
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        overlap: Counter = Counter()
+        for token in tokens:
+            overlap.update(self._postings.get(token, ()))
+        if not overlap:
+            return None
+        # Highest overlap wins; ties go to the earliest document.
+        position, hits = min(overlap.items(), key=lambda item: (-item[1], item[0]))
+        score = hits / len(tokens)
+        return (position, score) if score >= threshold else None
+
+
+__all__ = ["STOPWORDS", "TokenIndex", "stem", "token_forms", "tokenize"]
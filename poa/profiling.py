@@ -0,0 +1,307 @@
+"""Opt-in instrumentation: phases, SQL statements, connections and subprocesses.
+
+Nothing is recorded until ``enable()`` is called; until then the hooks in
+storage and gitlog cost one global lookup. ``poa --profile`` enables it for
+one command and prints the report; ``poa --profile serve`` keeps counting
+for the daemon's lifetime and ``poa metrics`` exports the totals in the
+Prometheus text format.
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import ContextManager, Dict, Iterator, List, Optional
+
+
+# Distinct statements kept per profiler; later ones are folded into "other".
+MAX_STATEMENTS = 500
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class Timing:
+    """Accumulated calls, wall time and rows for one phase or statement."""
+
+    __slots__ = ("calls", "seconds", "rows")
+
+    calls: int
+    seconds: float
+    rows: int
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace so one statement maps to one key however it is laid out."""
+
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class Profiler:
+    """Thread-safe accumulator behind ``--profile`` and ``poa metrics``."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.phases: Dict[str, Timing] = {}
+        self.statements: Dict[str, Timing] = {}
+        self.subprocesses: Dict[str, Timing] = {}
+        self.connections = 0
+        self.traced = 0
+
+    def _add(self, table: Dict[str, Timing], key: str, calls: int, seconds: float, rows: int) -> None:
+        with self._lock:
+            timing = table.get(key)
+            if timing is None:
+                if table is self.statements and len(table) >= MAX_STATEMENTS:
+                    key = "other"
+                timing = table.setdefault(key, Timing(0, 0.0, 0))
+            timing.calls += calls
+            timing.seconds += seconds
+            timing.rows += rows
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the block as ``name``; phases may nest and repeat."""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(self.phases, name, 1, time.perf_counter() - start, 0)
+
+    def record_statement(self, sql: str, seconds: float, rows: int, calls: int = 1) -> None:
+        self._add(self.statements, normalize_sql(sql), calls, seconds, rows)
+
+    def record_subprocess(self, name: str, seconds: float) -> None:
+        self._add(self.subprocesses, name, 1, seconds, 0)
+
+    def record_connection(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def on_trace(self, statement: str) -> None:
+        """``sqlite3`` trace callback: counts every statement SQLite runs.
+
+        Unlike the cursor timings this includes implicit statements and each
+        trigger step, so the gap between the two shows hidden work.
+        """
+
+        with self._lock:
+            self.traced += 1
+
+    def report(self, top: int = 20) -> Dict[str, object]:
+        """Summarise everything recorded so far, slowest statements first."""
+
+        def rows(table: Dict[str, Timing], limit: Optional[int] = None) -> List[Dict[str, object]]:
+            ordered = sorted(table.items(), key=lambda item: item[1].seconds, reverse=True)
+            return [
+                {
+                    "name": name,
+                    "calls": timing.calls,
+                    "ms": round(timing.seconds * 1000, 3),
+                    "rows": timing.rows,
+                }
+                for name, timing in ordered[:limit]
+            ]
+
+        with self._lock:
+            sql_seconds = sum(timing.seconds for timing in self.statements.values())
+            return {
+                "wall_ms": round((time.perf_counter() - self.started) * 1000, 3),
+                "phases": rows(self.phases),
+                "connections_opened": self.connections,
+                "sql": {
+                    "statements": sum(timing.calls for timing in self.statements.values()),
+                    "traced": self.traced,
+                    "ms": round(sql_seconds * 1000, 3),
+                    "rows": sum(timing.rows for timing in self.statements.values()),
+                    "top": rows(self.statements, top),
+                },
+                "subprocesses": rows(self.subprocesses),
+            }
+
+    def prometheus(self) -> str:
+        """Render the counters in the Prometheus text exposition format."""
+
+        lines: List[str] = []
+
+        def family(name: str, help_text: str, kind: str = "counter") -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def label(value: str) -> str:
+            return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+        with self._lock:
+            family("poa_uptime_seconds", "Seconds since profiling was enabled.", "gauge")
+            lines.append(f"poa_uptime_seconds {time.perf_counter() - self.started:.6f}")
+            family("poa_connections_opened_total", "SQLite connections opened.")
+            lines.append(f"poa_connections_opened_total {self.connections}")
+            family("poa_sqlite_traced_statements_total", "Statements reported by the SQLite trace hook.")
+            lines.append(f"poa_sqlite_traced_statements_total {self.traced}")
+            for metric, table, key in (
+                ("poa_phase", self.phases, "phase"),
+                ("poa_sql", self.statements, "statement"),
+                ("poa_subprocess", self.subprocesses, "command"),
+            ):
+                family(f"{metric}_calls_total", f"Calls per {key}.")
+                lines.extend(
+                    f'{metric}_calls_total{{{key}="{label(name)}"}} {timing.calls}'
+                    for name, timing in table.items()
+                )
+                family(f"{metric}_seconds_total", f"Wall time per {key}.")
+                lines.extend(
+                    f'{metric}_seconds_total{{{key}="{label(name)}"}} {timing.seconds:.6f}'
+                    for name, timing in table.items()
+                )
+            family("poa_sql_rows_total", "Rows fetched or changed per statement.")
+            lines.extend(
+                f'poa_sql_rows_total{{statement="{label(name)}"}} {timing.rows}'
+                for name, timing in self.statements.items()
+            )
+        return "\n".join(lines) + "\n"
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor that charges execute and fetch time to its statement."""
+
+    _sql = ""
+
+    def _charge(self, start: float, rows: int, calls: int = 0) -> None:
+        profiler = _profiler
+        if profiler is not None:
+            profiler.record_statement(self._sql, time.perf_counter() - start, rows, calls)
+
+    def execute(self, sql, parameters=()):  # type: ignore[override]
+        self._sql = sql
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._charge(start, max(self.rowcount, 0), calls=1)
+
+    def executemany(self, sql, seq_of_parameters):  # type: ignore[override]
+        self._sql = sql
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._charge(start, max(self.rowcount, 0), calls=1)
+
+    def executescript(self, sql_script):  # type: ignore[override]
+        self._sql = sql_script
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self._charge(start, 0, calls=1)
+
+    def fetchone(self):  # type: ignore[override]
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._charge(start, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size: int = -1):  # type: ignore[override]
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size < 0 else size)
+        self._charge(start, len(rows))
+        return rows
+
+    def fetchall(self):  # type: ignore[override]
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._charge(start, len(rows))
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._charge(start, 0)
+            raise
+        self._charge(start, 1)
+        return row
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connection whose shortcuts and cursors go through ``ProfiledCursor``."""
+
+    def cursor(self, factory=ProfiledCursor):  # type: ignore[override]
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):  # type: ignore[override]
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):  # type: ignore[override]
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):  # type: ignore[override]
+        return self.cursor().executescript(sql_script)
+
+
+_profiler: Optional[Profiler] = None
+
+
+def enable() -> Profiler:
+    """Start recording in this process; connections opened from now on are traced."""
+
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+    return _profiler
+
+
+def disable() -> Optional[Profiler]:
+    """Stop recording and return the profiler that was active."""
+
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+def active() -> Optional[Profiler]:
+    return _profiler
+
+
+def phase(name: str) -> ContextManager[None]:
+    """Time a block as ``name`` when profiling, otherwise do nothing."""
+
+    profiler = _profiler
+    return nullcontext() if profiler is None else profiler.phase(name)
+
+
+@contextmanager
+def subprocess_timer(name: str) -> Iterator[None]:
+    """Charge the block's wall time to the subprocess ``name``."""
+
+    profiler = _profiler
+    if profiler is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.record_subprocess(name, time.perf_counter() - start)
+
+
+__all__ = [
+    "MAX_STATEMENTS",
+    "ProfiledConnection",
+    "ProfiledCursor",
+    "Profiler",
+    "Timing",
+    "active",
+    "disable",
+    "enable",
+    "normalize_sql",
+    "phase",
+    "subprocess_timer",
+]
@@ -0,0 +1,103 @@
+"""Declarative keyword rules and the single-pass matcher built from them."""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Mapping, Tuple
+
+
+# Category -> keywords. A category hits when any keyword occurs as a
+# substring of the lowercased text, exactly like ``word in text``.
+KEYWORD_RULES: Dict[str, Tuple[str, ...]] = {
+    # Task scoring
+    "stimulating": ("build", "design", "architect", "engine", "model", "algorithm"),
+    "research": ("research", "experiment", "novel"),
+    "systemic": ("optimize", "refactor", "system", "pipeline", "automation", "framework"),
+    "automatable": ("automate", "automation", "script", "template", "bot"),
+    "tedious": ("repeat", "daily", "weekly", "boring", "manual"),
+    "human_heavy": ("email", "call", "meeting", "customer", "client", "interview", "conference"),
+    "human_light": ("review", "feedback", "sync"),
+    "repetition": ("again", "follow up", "respond", "update", "report"),
+    "maintenance": ("debug", "fix", "maintain"),
+    "building": ("build",),
+    # Alternatives
+    "documentation": ("document", "doc"),
+    # Decisions
+    "networking": ("conference", "meet", "network", "event", "call"),
+    "knowledge": ("learn", "workshop", "course", "deep dive", "technical"),
+    "logistics": ("travel", "flight", "hotel", "schedule"),
+    "purchase": ("buy",),
+    # Open loop triage
+    "loop_follow_up": ("follow up",),
+    "loop_speculative": ("maybe", "should", "consider"),
+    "loop_networking": ("network",),
+}
+
+MATCH_CACHE_SIZE = 65536
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """Build a regex alternation factored by common prefixes.
+
+    Optional suffixes are greedy, so the longest keyword at a position wins.
+    """
+
+    root: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = root
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return render(root)
+
+
+class KeywordMatcher:
+    """Match every rule category in one regex scan of the text."""
+
+    def __init__(self, rules: Mapping[str, Tuple[str, ...]]) -> None:
+        owners: Dict[str, set] = {}
+        for category, keywords in rules.items():
+            for keyword in keywords:
+                owners.setdefault(keyword.lower(), set()).add(category)
+        # Only the longest keyword is reported per position, so a hit also
+        # counts for every keyword contained in it.
+        self._categories: Dict[str, FrozenSet[str]] = {
+            keyword: frozenset().union(
+                *(categories for other, categories in owners.items() if other in keyword)
+            )
+            for keyword in owners
+        }
+        # A lookahead lets matches overlap ("systemodel" holds both "system"
+        # and "model"); the trie keeps the per-position work small.
+        self._pattern = re.compile(f"(?=({_trie_pattern(owners)}))")
+
+    def match(self, text: str) -> FrozenSet[str]:
+        """Return the categories whose keywords occur in ``text``."""
+
+        found = self._pattern.findall(text.lower())
+        if not found:
+            return frozenset()
+        categories = self._categories
+        return frozenset().union(*(categories[keyword] for keyword in set(found)))
+
+
+_matcher = KeywordMatcher(KEYWORD_RULES)
+
+
+@lru_cache(maxsize=MATCH_CACHE_SIZE)
+def match_keywords(text: str) -> FrozenSet[str]:
+    """Return the rule categories hit by ``text``, memoised per text."""
+
+    return _matcher.match(text)
+
+
+__all__ = ["KEYWORD_RULES", "KeywordMatcher", "MATCH_CACHE_SIZE", "match_keywords"]
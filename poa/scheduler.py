@@ -0,0 +1,296 @@
+"""Energy-aware weekly planning: pack active tasks into focus blocks.
+
+The week is cut into fixed-length focus blocks between the configured local
+hours. A block's energy comes from the hour-of-day curve: the defaults
+``energy_tracker`` starts from, pulled towards the levels the hourly energy
+rollups actually recorded. A task demands high, medium or low energy by
+category and is worth its priority; placed in a block, it keeps the share
+of that worth the block's energy allows.
+
+Within one demand level tasks differ only in weight, so at most one block's
+worth of each level can ever be scheduled: the candidates are the heaviest
+``len(blocks)`` tasks per level, whatever the size of the backlog. A greedy
+pass places the best (task, block) pairs first; local search then swaps
+blocks and trades placed tasks for unplaced ones while that gains anything.
+"""
+
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from .config import (
+    SCHEDULE_BLOCK_MINUTES,
+    SCHEDULE_DAY_END,
+    SCHEDULE_DAY_START,
+    SCHEDULE_PRIOR_SAMPLES,
+)
+from .storage import ENERGY_ROLLUPS
+
+# Energy a task needs, on the scale ``energy_tracker`` reports.
+HIGH_DEMAND = 80
+MEDIUM_DEMAND = 60
+LOW_DEMAND = 35
+
+CATEGORY_DEMAND: Dict[str, int] = {
+    "build": HIGH_DEMAND,
+    "research": HIGH_DEMAND,
+    "automation": MEDIUM_DEMAND,
+    "boring": LOW_DEMAND,
+    "maintenance": LOW_DEMAND,
+    "admin": LOW_DEMAND,
+}
+
+# Tasks planned for this week count this much more than the rest.
+PLANNED_BONUS = 1.5
+
+# A block this many points below a task's demand keeps none of its value;
+# surplus energy only costs a little.
+_SHORTFALL = 40.0
+_SURPLUS = 200.0
+_EPSILON = 1e-9
+
+# Column order ``select_candidates`` expects.
+CANDIDATE_COLUMNS: Tuple[str, ...] = (
+    "id",
+    "description",
+    "category",
+    "priority",
+    "stimulation",
+    "system_building",
+    "planned_for_week",
+)
+
+
+@dataclass
+class Block:
+    """One focus block in local time, with its expected energy."""
+
+    __slots__ = ("start", "end", "energy")
+
+    start: datetime
+    end: datetime
+    energy: float
+
+
+@dataclass
+class Candidate:
+    """An active task that may be scheduled."""
+
+    __slots__ = ("id", "description", "category", "priority", "planned", "demand", "weight")
+
+    id: int
+    description: str
+    category: str
+    priority: int
+    planned: bool
+    demand: int
+    weight: float
+
+
+def baseline_energy(hour: int) -> int:
+    """Default energy for a local hour of the day, before any logged levels."""
+
+    if hour >= 20 or hour <= 6:
+        return 35
+    return 80 if 8 <= hour <= 12 else 60
+
+
+def energy_curve(rollups: Iterable[Mapping], prior_samples: int = SCHEDULE_PRIOR_SAMPLES) -> List[float]:
+    """Expected energy for each local hour 0-23 from ``energy_hourly`` rows (UTC buckets)."""
+
+    totals = [float(baseline_energy(hour) * prior_samples) for hour in range(24)]
+    samples = [prior_samples] * 24
+    for row in rollups:
+        bucket = datetime.strptime(row["bucket"], ENERGY_ROLLUPS["energy_hourly"])
+        hour = bucket.replace(tzinfo=timezone.utc).astimezone().hour
+        totals[hour] += row["total"]
+        samples[hour] += row["samples"]
+    return [
+        totals[hour] / samples[hour] if samples[hour] else float(baseline_energy(hour)) for hour in range(24)
+    ]
+
+
+def _block_energy(curve: Sequence[float], start: datetime, end: datetime) -> float:
+    # Average of the curve over the block, weighted by minutes in each hour.
+    total = 0.0
+    moment = start
+    while moment < end:
+        boundary = min(end, moment.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1))
+        total += curve[moment.hour] * (boundary - moment).total_seconds()
+        moment = boundary
+    return total / (end - start).total_seconds()
+
+
+def week_blocks(
+    start: datetime,
+    curve: Sequence[float],
+    days: int = 7,
+    day_start: int = SCHEDULE_DAY_START,
+    day_end: int = SCHEDULE_DAY_END,
+    minutes: int = SCHEDULE_BLOCK_MINUTES,
+) -> List[Block]:
+    """Blocks that begin within ``days`` days of ``start`` (naive local time)."""
+
+    if days < 1:
+        raise ValueError("days must be at least 1")
+    length = timedelta(minutes=minutes)
+    stop = start + timedelta(days=days)
+    blocks: List[Block] = []
+    for offset in range(days + 1):
+        day = (start + timedelta(days=offset)).replace(hour=0, minute=0, second=0, microsecond=0)
+        moment, closing = day + timedelta(hours=day_start), day + timedelta(hours=day_end)
+        while moment + length <= closing:
+            if start <= moment < stop:
+                blocks.append(Block(moment, moment + length, _block_energy(curve, moment, moment + length)))
+            moment += length
+    return blocks
+
+
+def task_demand(category: str, stimulation: int, system_building: int) -> int:
+    """Energy a task needs: by category, else by how absorbing and systemic it is."""
+
+    demand = CATEGORY_DEMAND.get(category)
+    if demand is not None:
+        return demand
+    effort = stimulation + system_building
+    if effort >= 4:
+        return HIGH_DEMAND
+    return MEDIUM_DEMAND if effort >= 2 else LOW_DEMAND
+
+
+def fit(energy: float, demand: int) -> float:
+    """Share of a task's value kept in a block with ``energy``."""
+
+    gap = energy - demand
+    if gap >= 0:
+        return 1.0 - gap / _SURPLUS
+    return max(0.0, 1.0 + gap / _SHORTFALL)
+
+
+def select_candidates(rows: Iterable[tuple], slots: int) -> Tuple[List[Candidate], int]:
+    """The ``slots`` heaviest tasks of each demand level, and how many rows were seen.
+
+    ``rows`` hold ``CANDIDATE_COLUMNS`` in order; ties go to the older task.
+    """
+
+    heaps: Dict[int, List[Tuple[float, int, tuple]]] = {}
+    seen = 0
+    for row in rows:
+        seen += 1
+        task_id, _, category, priority, stimulation, system_building, planned = row
+        weight = max(priority, 0) + 1.0
+        if planned:
+            weight *= PLANNED_BONUS
+        heap = heaps.setdefault(task_demand(category, stimulation, system_building), [])
+        entry = (weight, -task_id, row)
+        if len(heap) < slots:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+    candidates = [
+        Candidate(row[0], row[1], row[2], row[3], bool(row[6]), demand, weight)
+        for demand, heap in heaps.items()
+        for weight, _, row in heap
+    ]
+    candidates.sort(key=lambda candidate: (-candidate.weight, candidate.id))
+    return candidates, seen
+
+
+def plan(
+    candidates: Sequence[Candidate], blocks: Sequence[Block], max_rounds: int = 50
+) -> Tuple[List[Optional[Candidate]], Dict[str, float]]:
+    """Assign at most one candidate per block; return the assignment and search stats."""
+
+    demands = {candidate.demand for candidate in candidates}
+    fits = {demand: [fit(block.energy, demand) for block in blocks] for demand in demands}
+    scores = [[candidate.weight * share for share in fits[candidate.demand]] for candidate in candidates]
+
+    def score(index: Optional[int], block: int) -> float:
+        return 0.0 if index is None else scores[index][block]
+
+    # Greedy: best remaining (candidate, block) pair first.
+    assigned: List[Optional[int]] = [None] * len(blocks)
+    placed = set()
+    pairs = sorted(
+        (
+            (value, index, block)
+            for index, row in enumerate(scores)
+            for block, value in enumerate(row)
+            if value > 0
+        ),
+        key=lambda pair: -pair[0],
+    )
+    for _, index, block in pairs:
+        if assigned[block] is None and index not in placed:
+            assigned[block] = index
+            placed.add(index)
+            if len(placed) == len(blocks):
+                break
+    greedy = sum(score(index, block) for block, index in enumerate(assigned))
+
+    # Unplaced candidates are tried heaviest first within each demand level.
+    by_level: Dict[int, List[int]] = {}
+    for index, candidate in enumerate(candidates):
+        by_level.setdefault(candidate.demand, []).append(index)
+
+    swaps = replacements = rounds = 0
+    improved = True
+    while improved and rounds < max_rounds:
+        improved = False
+        rounds += 1
+        for first in range(len(blocks)):
+            for second in range(first + 1, len(blocks)):
+                left, right = assigned[first], assigned[second]
+                if left is None and right is None:
+                    continue
+                gain = (
+                    score(left, second) + score(right, first) - score(left, first) - score(right, second)
+                )
+                if gain > _EPSILON:
+                    assigned[first], assigned[second] = right, left
+                    swaps += 1
+                    improved = True
+        for block in range(len(blocks)):
+            for indexes in by_level.values():
+                index = next((index for index in indexes if index not in placed), None)
+                if index is None:
+                    continue
+                current = assigned[block]
+                if score(index, block) - score(current, block) > _EPSILON:
+                    placed.add(index)
+                    placed.discard(current)
+                    assigned[block] = index
+                    replacements += 1
+                    improved = True
+
+    total = sum(score(index, block) for block, index in enumerate(assigned))
+    stats = {
+        "greedy_score": round(greedy, 3),
+        "score": round(total, 3),
+        "swaps": swaps,
+        "replacements": replacements,
+        "rounds": rounds,
+    }
+    return [None if index is None else candidates[index] for index in assigned], stats
+
+
+__all__ = [
+    "Block",
+    "CANDIDATE_COLUMNS",
+    "CATEGORY_DEMAND",
+    "Candidate",
+    "HIGH_DEMAND",
+    "LOW_DEMAND",
+    "MEDIUM_DEMAND",
+    "PLANNED_BONUS",
+    "baseline_energy",
+    "energy_curve",
+    "fit",
+    "plan",
+    "select_candidates",
+    "task_demand",
+    "week_blocks",
+]
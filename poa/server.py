@@ -0,0 +1,103 @@
+"""asyncio server half of the ``poa serve`` daemon."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional
+
+from . import storage, writer
+from .assistant import PersonalOpsAssistant
+from .commands import run_command
+from .config import SOCKET_PATH
+from .daemon import daemon_alive
+
+
+# Requests larger than this are rejected rather than buffered.
+_MAX_REQUEST_BYTES = 1 << 20
+
+
+class AssistantServer:
+    """Keep one warm assistant and answer command requests on a socket."""
+
+    def __init__(self, socket_path: Path = SOCKET_PATH) -> None:
+        self.socket_path = Path(socket_path)
+        # A single worker thread owns the assistant and its pooled connection,
+        # so requests run one at a time against warm state.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="poa-daemon")
+        # One warm assistant per user shard, keyed by user id (None: default).
+        self._assistants: Dict[Optional[str], PersonalOpsAssistant] = {}
+
+    def _assistant(self, user: Optional[str] = None) -> PersonalOpsAssistant:
+        assistant = self._assistants.get(user)
+        if assistant is None:
+            assistant = self._assistants[user] = PersonalOpsAssistant(user=user)
+        return assistant
+
+    def _warm_up(self) -> None:
+        self._assistant()
+        # Event logging from requests should never wait on an fsync.
+        writer.install()
+
+    def _execute(self, command: str, params: Mapping[str, Any]) -> Dict[str, object]:
+        return run_command(self._assistant(params.get("user")), command, params)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    result = await loop.run_in_executor(
+                        self._executor,
+                        self._execute,
+                        request["command"],
+                        request.get("params") or {},
+                    )
+                    response = {"ok": True, "result": result}
+                except Exception as exc:  # reported to the client, never fatal
+                    response = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+                writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        """Listen until SIGINT/SIGTERM, then remove the socket."""
+
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            if daemon_alive(self.socket_path):
+                raise RuntimeError(f"poa daemon already listening on {self.socket_path}")
+            self.socket_path.unlink()
+        loop = asyncio.get_running_loop()
+        # Build the assistant (schema setup, connection) before accepting clients.
+        await loop.run_in_executor(self._executor, self._warm_up)
+        server = await asyncio.start_unix_server(
+            self._handle, path=str(self.socket_path), limit=_MAX_REQUEST_BYTES
+        )
+        os.chmod(self.socket_path, 0o600)
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+            writer.uninstall()
+            await loop.run_in_executor(self._executor, storage.close_connections)
+            self._executor.shutdown(wait=True)
+
+
+__all__ = ["AssistantServer"]
@@ -2,156 +2,849 @@
 
 from __future__ import annotations
 
+import atexit
+import functools
+import hashlib
 import json
+import os
+import re
 import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
 from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta
+from itertools import combinations, islice
+from math import comb
 from pathlib import Path
-from typing import Dict, Iterator, List, Optional
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Protocol, Sequence, Tuple, TypeVar
 
-from .config import DB_PATH, DEFAULT_OPEN_LOOPS, DEFAULT_TASKS, ensure_data_dir
+from . import profiling
+from .cache import MISSING, ResultCache
+from .matching import STOPWORDS
+from .config import (
+    ARCHIVE_SEGMENT_ROWS,
+    DB_PATH,
+    DEFAULT_OPEN_LOOPS,
+    DEFAULT_TASKS,
+    ENERGY_EMA_ALPHA,
+    MAX_POOLED_CONNECTIONS,
+    RESULT_CACHE,
+    RESULT_CACHE_MAX_BYTES,
+    RESULT_CACHE_MAX_ENTRIES,
+    SHARD_DIR,
+    SQLITE_PRAGMAS,
+)
 
 
-@contextmanager
-def get_connection(db_path: Path = DB_PATH) -> Iterator[sqlite3.Connection]:
-    """Yield a SQLite connection with foreign keys enabled."""
+_local = threading.local()
+
+T = TypeVar("T")
+
+FETCH_BATCH_SIZE = 500
+
 
-    ensure_data_dir()
-    conn = sqlite3.connect(db_path)
+def _connect(db_path: Path) -> sqlite3.Connection:
+    """Open a connection and apply the configured pragmas."""
+
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    profiler = profiling.active()
+    if profiler is None:
+        conn = sqlite3.connect(db_path, isolation_level=None)
+    else:
+        conn = sqlite3.connect(db_path, isolation_level=None, factory=profiling.ProfiledConnection)
+        conn.set_trace_callback(profiler.on_trace)
+        profiler.record_connection()
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
+    for pragma, value in SQLITE_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+
+def _pool() -> "OrderedDict[str, sqlite3.Connection]":
+    """Return the connection pool owned by the current thread and process."""
+
+    pid = os.getpid()
+    if getattr(_local, "pid", None) != pid:
+        # Connections must never cross a fork; start a fresh pool in the child.
+        _local.pid = pid
+        _local.connections = OrderedDict()
+    return _local.connections
+
+
+# The database storage functions use when no path is passed: DB_PATH unless
+# a ``use_database`` block (e.g. a user's shard) is active in this context.
+_active_database: ContextVar[Path] = ContextVar("poa_active_database", default=DB_PATH)
+
+
+def current_database() -> Path:
+    """Return the database storage functions currently default to."""
+
+    return _active_database.get()
+
+
+@contextmanager
+def use_database(db_path: Path) -> Iterator[Path]:
+    """Point storage calls without an explicit path at ``db_path`` in this context."""
+
+    token = _active_database.set(Path(db_path))
     try:
-        yield conn
+        yield Path(db_path)
     finally:
-        conn.commit()
+        _active_database.reset(token)
+
+
+_SAFE_USER = re.compile(r"[A-Za-z0-9][A-Za-z0-9._@-]{0,127}")
+
+
+def shard_path(user: str, shard_dir: Optional[Path] = None) -> Path:
+    """Map a user ID to its own SQLite file under ``SHARD_DIR``.
+
+    Files are fanned out over 256 subdirectories by a hash of the ID, so
+    directories stay small with thousands of users.
+    """
+
+    if not _SAFE_USER.fullmatch(user):
+        raise ValueError(f"Invalid user id: {user!r}")
+    bucket = hashlib.sha1(user.encode("utf-8")).hexdigest()[:2]
+    return Path(shard_dir or SHARD_DIR) / bucket / f"{user}.db"
+
+
+def list_users(shard_dir: Optional[Path] = None) -> List[str]:
+    """Return the IDs of every user with a shard, sorted."""
+
+    return sorted(path.stem for path in Path(shard_dir or SHARD_DIR).glob("??/*.db"))
+
+
+def connection(db_path: Optional[Path] = None) -> sqlite3.Connection:
+    """Return the long-lived connection for ``db_path`` in this thread.
+
+    Defaults to the active database. At most ``MAX_POOLED_CONNECTIONS`` stay
+    open per thread; the least recently used idle one is closed first.
+    """
+
+    pool = _pool()
+    key = str(db_path or _active_database.get())
+    conn = pool.get(key)
+    if conn is not None:
+        pool.move_to_end(key)
+        return conn
+    conn = pool[key] = _connect(Path(key))
+    if len(pool) > MAX_POOLED_CONNECTIONS:
+        for stale_key, stale in list(pool.items())[:-1]:
+            if not stale.in_transaction:
+                del pool[stale_key]
+                stale.close()
+                break
+    return conn
+
+
+def close_connections() -> None:
+    """Close every pooled connection held by the current thread."""
+
+    pool = _pool()
+    while pool:
+        _, conn = pool.popitem()
         conn.close()
 
 
-def setup_database(db_path: Path = DB_PATH) -> None:
-    """Initialize the database schema."""
+atexit.register(close_connections)
 
-    with get_connection(db_path) as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                description TEXT NOT NULL,
-                category TEXT NOT NULL,
-                stimulation INTEGER NOT NULL,
-                system_building INTEGER NOT NULL,
-                automation_potential INTEGER NOT NULL,
-                human_interaction INTEGER NOT NULL,
-                repetitive INTEGER NOT NULL DEFAULT 0,
-                status TEXT NOT NULL DEFAULT 'pending',
-                planned_for_week INTEGER NOT NULL DEFAULT 0,
-                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
+
+@contextmanager
+def transaction(db_path: Optional[Path] = None, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+    """Group every statement in the block into a single atomic commit.
+
+    Nested scopes join the outermost transaction, so callers can wrap several
+    storage functions and pay for one commit. ``immediate`` takes the write
+    lock when the transaction starts instead of at the first write.
+    """
+
+    conn = connection(db_path)
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+
+# Every storage function runs in its own transaction unless an outer
+# ``transaction()`` is already open.
+get_connection = transaction
+
+
+# The brutalist priority algorithm, materialised as a generated column so it
+# can be indexed instead of recomputed and sorted on every fetch.
+PRIORITY_SQL = (
+    "stimulation * 3 + system_building * 2 + automation_potential * 2 - human_interaction * 5"
+)
+
+TASK_COLUMNS = frozenset(
+    {
+        "id",
+        "description",
+        "category",
+        "stimulation",
+        "system_building",
+        "automation_potential",
+        "human_interaction",
+        "repetitive",
+        "status",
+        "planned_for_week",
+        "created_at",
+        "updated_at",
+        "priority",
+    }
+)
+
+# Brief queries repeat these predicates verbatim so SQLite can match them
+# against the partial indexes below and stop after a LIMIT's worth of rows.
+ACTIVE_TASK_SQL = "status != 'done'"
+CHORE_TASK_SQL = "category IN ('boring', 'maintenance')"
+IGNORABLE_TASK_SQL = "(human_interaction >= 2 OR priority <= 0)"
+
+INDEXES: Dict[str, str] = {
+    "idx_tasks_priority": "CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks (priority DESC, id)",
+    "idx_tasks_active_priority": (
+        "CREATE INDEX IF NOT EXISTS idx_tasks_active_priority ON tasks (priority DESC, id) "
+        f"WHERE {ACTIVE_TASK_SQL}"
+    ),
+    "idx_tasks_active_chores": (
+        "CREATE INDEX IF NOT EXISTS idx_tasks_active_chores ON tasks (priority DESC, id) "
+        f"WHERE {ACTIVE_TASK_SQL} AND {CHORE_TASK_SQL}"
+    ),
+    "idx_tasks_active_ignorable": (
+        "CREATE INDEX IF NOT EXISTS idx_tasks_active_ignorable ON tasks (priority DESC, id) "
+        f"WHERE {ACTIVE_TASK_SQL} AND {IGNORABLE_TASK_SQL}"
+    ),
+    "idx_tasks_planned": (
+        "CREATE INDEX IF NOT EXISTS idx_tasks_planned ON tasks (planned_for_week) "
+        "WHERE planned_for_week = 1"
+    ),
+    "idx_open_loops_status_created": (
+        "CREATE INDEX IF NOT EXISTS idx_open_loops_status_created ON open_loops (status, created_at)"
+    ),
+    "idx_energy_events_created": (
+        "CREATE INDEX IF NOT EXISTS idx_energy_events_created ON energy_events (created_at)"
+    ),
+    "idx_git_commits_repo_time": (
+        "CREATE INDEX IF NOT EXISTS idx_git_commits_repo_time ON git_commits (repo, committed_at)"
+    ),
+    "idx_focus_sessions_started": (
+        "CREATE INDEX IF NOT EXISTS idx_focus_sessions_started ON focus_sessions (started_at)"
+    ),
+    "idx_archive_segments_source_period": (
+        "CREATE INDEX IF NOT EXISTS idx_archive_segments_source_period "
+        "ON archive_segments (source, period)"
+    ),
+}
+
+# Event tables that ``archive_events`` moves into compressed segments, with
+# the column holding each row's timestamp. focus_sessions stores ISO 8601
+# with a 'T' separator; the others use SQLite's CURRENT_TIMESTAMP format.
+ARCHIVE_TABLES: Dict[str, str] = {
+    "activity_log": "created_at",
+    "energy_events": "created_at",
+    "focus_sessions": "started_at",
+}
+
+
+def _stream(
+    sql: str,
+    params,
+    limit: Optional[int],
+    batch_size: int,
+    db_path: Optional[Path] = None,
+) -> Iterator[sqlite3.Row]:
+    """Yield rows in ``fetchmany`` batches from the pooled connection.
+
+    The statement's trailing ``LIMIT`` placeholder receives ``limit`` (``-1``
+    means unbounded). The cursor, and with it the read snapshot, stays open
+    until the generator is exhausted or closed.
+    """
+
+    bound = -1 if limit is None else limit
+    if isinstance(params, dict):
+        params = {**params, "limit": bound}
+    else:
+        params = [*params, bound]
+    # The database is picked when the iterator is created, not when it is
+    # first advanced, so it stays tied to the caller's active shard.
+    return _iter_cursor(connection(db_path), sql, params, batch_size)
+
+
+def _iter_cursor(conn: sqlite3.Connection, sql: str, params, batch_size: int) -> Iterator[sqlite3.Row]:
+    cursor = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def _has_column(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    # table_xinfo (unlike table_info) also lists generated columns.
+    return any(row["name"] == column for row in conn.execute(f"PRAGMA table_xinfo({table})"))
+
+
+_ROLLUP_COLUMNS = """
+    bucket TEXT PRIMARY KEY,
+    samples INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    min_level INTEGER NOT NULL,
+    max_level INTEGER NOT NULL,
+    last_level INTEGER NOT NULL,
+    last_at TEXT NOT NULL
+"""
+
+# Bucket keys share the CURRENT_TIMESTAMP format so they sort as text.
+ENERGY_ROLLUPS: Dict[str, str] = {
+    "energy_hourly": "%Y-%m-%d %H:00:00",
+    "energy_daily": "%Y-%m-%d",
+}
+
+
+def _sql_timestamp(moment: datetime) -> str:
+    """Format a UTC datetime the way SQLite's CURRENT_TIMESTAMP does."""
+
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _setup_energy_rollups(cursor: sqlite3.Cursor) -> None:
+    """Version 5: trigger-maintained rollups and the EMA over energy_events."""
+
+    for table, bucket_format in ENERGY_ROLLUPS.items():
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} ({_ROLLUP_COLUMNS})")
         cursor.execute(
-            """
-            CREATE TRIGGER IF NOT EXISTS tasks_updated_at
-            AFTER UPDATE ON tasks
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_rollup
+            AFTER INSERT ON energy_events
             FOR EACH ROW
             BEGIN
-                UPDATE tasks SET updated_at = CURRENT_TIMESTAMP WHERE id = OLD.id;
+                INSERT INTO {table} (
+                    bucket, samples, total, min_level, max_level, last_level, last_at
+                ) VALUES (
+                    strftime('{bucket_format}', NEW.created_at),
+                    1, NEW.level, NEW.level, NEW.level, NEW.level, NEW.created_at
+                )
+                ON CONFLICT (bucket) DO UPDATE SET
+                    samples = samples + 1,
+                    total = total + excluded.total,
+                    min_level = min(min_level, excluded.min_level),
+                    max_level = max(max_level, excluded.max_level),
+                    last_level = CASE
+                        WHEN excluded.last_at >= last_at THEN excluded.last_level
+                        ELSE last_level
+                    END,
+                    last_at = max(last_at, excluded.last_at);
             END;
             """
         )
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS activity_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                event TEXT NOT NULL,
-                details TEXT,
-                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        if not exists:
+            # Backfill from whatever raw history predates the rollup.
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (
+                    bucket, samples, total, min_level, max_level, last_level, last_at
+                )
+                SELECT
+                    bucket, samples, total, min_level, max_level,
+                    (SELECT level FROM energy_events
+                     WHERE created_at = grouped.last_at
+                     ORDER BY id DESC LIMIT 1),
+                    last_at
+                FROM (
+                    SELECT
+                        strftime('{bucket_format}', created_at) AS bucket,
+                        COUNT(*) AS samples,
+                        SUM(level) AS total,
+                        MIN(level) AS min_level,
+                        MAX(level) AS max_level,
+                        MAX(created_at) AS last_at
+                    FROM energy_events
+                    GROUP BY bucket
+                ) AS grouped
+                """
             )
-            """
+
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'energy_ema'"
+    ).fetchone()
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS energy_ema (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            value REAL NOT NULL,
+            samples INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
         )
+        """
+    )
+    # The smoothing factor is baked into the trigger when it is created.
+    cursor.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS energy_ema_update
+        AFTER INSERT ON energy_events
+        FOR EACH ROW
+        BEGIN
+            INSERT INTO energy_ema (id, value, samples, updated_at)
+            VALUES (1, NEW.level, 1, NEW.created_at)
+            ON CONFLICT (id) DO UPDATE SET
+                value = value + {float(ENERGY_EMA_ALPHA)} * (excluded.value - value),
+                samples = samples + 1,
+                updated_at = excluded.updated_at;
+        END;
+        """
+    )
+    if not exists:
+        ema: Optional[float] = None
+        samples = 0
+        updated_at = None
+        for row in cursor.execute(
+            "SELECT level, created_at FROM energy_events ORDER BY created_at, id"
+        ).fetchall():
+            ema = row["level"] if ema is None else ema + ENERGY_EMA_ALPHA * (row["level"] - ema)
+            samples += 1
+            updated_at = row["created_at"]
+        if ema is not None:
+            cursor.execute(
+                "INSERT INTO energy_ema (id, value, samples, updated_at) VALUES (1, ?, ?, ?)",
+                (ema, samples, updated_at),
+            )
+
+
+def _migrate_base_schema(cursor: sqlite3.Cursor) -> None:
+    """Version 1: the original tables (idempotent for pre-versioning databases)."""
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            description TEXT NOT NULL,
+            category TEXT NOT NULL,
+            stimulation INTEGER NOT NULL,
+            system_building INTEGER NOT NULL,
+            automation_potential INTEGER NOT NULL,
+            human_interaction INTEGER NOT NULL,
+            repetitive INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'pending',
+            planned_for_week INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS tasks_updated_at
+        AFTER UPDATE ON tasks
+        FOR EACH ROW
+        BEGIN
+            UPDATE tasks SET updated_at = CURRENT_TIMESTAMP WHERE id = OLD.id;
+        END;
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS activity_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event TEXT NOT NULL,
+            details TEXT,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS focus_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at TEXT NOT NULL,
+            duration_minutes INTEGER NOT NULL,
+            summary TEXT
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS energy_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            level INTEGER NOT NULL,
+            note TEXT,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS open_loops (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            description TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'open',
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+def _migrate_task_priority(cursor: sqlite3.Cursor) -> None:
+    """Version 2: the generated priority column."""
+
+    if not _has_column(cursor.connection, "tasks", "priority"):
+        # ALTER TABLE can only add VIRTUAL generated columns, so fresh and
+        # upgraded databases share this path; the index stores the values.
         cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS focus_sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                started_at TEXT NOT NULL,
-                duration_minutes INTEGER NOT NULL,
-                summary TEXT
+            f"ALTER TABLE tasks ADD COLUMN priority INTEGER "
+            f"GENERATED ALWAYS AS ({PRIORITY_SQL}) VIRTUAL"
+        )
+
+
+def _migrate_git_cache(cursor: sqlite3.Cursor) -> None:
+    """Version 3: the git commit cache."""
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS git_commits (
+            repo TEXT NOT NULL,
+            hash TEXT NOT NULL,
+            short_hash TEXT NOT NULL,
+            committed_at INTEGER NOT NULL,
+            subject TEXT NOT NULL,
+            PRIMARY KEY (repo, hash)
+        ) WITHOUT ROWID
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS git_heads (
+            repo TEXT PRIMARY KEY,
+            head TEXT NOT NULL,
+            synced_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+def _create_indexes(cursor: sqlite3.Cursor, *names: str) -> None:
+    for name in names:
+        cursor.execute(INDEXES[name])
+
+
+def _migrate_indexes(cursor: sqlite3.Cursor) -> None:
+    """Version 4: indexes behind the brief, iterator and git cache queries."""
+
+    _create_indexes(
+        cursor,
+        "idx_tasks_priority",
+        "idx_tasks_active_priority",
+        "idx_tasks_active_chores",
+        "idx_tasks_active_ignorable",
+        "idx_tasks_planned",
+        "idx_open_loops_status_created",
+        "idx_energy_events_created",
+        "idx_git_commits_repo_time",
+        "idx_focus_sessions_started",
+    )
+
+
+def _migrate_meta(cursor: sqlite3.Cursor) -> None:
+    """Version 6: key/value metadata, including the seeded flag."""
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+    # Databases that predate the flag were seeded if they hold any rows.
+    cursor.execute(
+        """
+        INSERT OR IGNORE INTO meta (key, value)
+        SELECT 'seeded', '1'
+        WHERE EXISTS (SELECT 1 FROM tasks) OR EXISTS (SELECT 1 FROM open_loops)
+        """
+    )
+
+
+def _migrate_archive(cursor: sqlite3.Cursor) -> None:
+    """Version 7: zlib-compressed archive segments for old event rows."""
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS archive_segments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            period TEXT NOT NULL,
+            first_id INTEGER NOT NULL,
+            last_id INTEGER NOT NULL,
+            row_count INTEGER NOT NULL,
+            columns TEXT NOT NULL,
+            payload BLOB NOT NULL,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    _create_indexes(cursor, "idx_archive_segments_source_period")
+
+
+# Full-text indexes: FTS5 table -> content table. The FTS tables store only
+# the index (external content) and triggers keep them in step.
+FTS_TABLES: Dict[str, str] = {"tasks_fts": "tasks", "open_loops_fts": "open_loops"}
+
+
+def _migrate_full_text(cursor: sqlite3.Cursor) -> None:
+    """Version 8: FTS5 indexes over task and open loop descriptions."""
+
+    for fts, table in FTS_TABLES.items():
+        cursor.execute(
+            f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                description,
+                content='{table}',
+                content_rowid='id',
+                tokenize='porter unicode61'
             )
             """
         )
         cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS energy_events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                level INTEGER NOT NULL,
-                note TEXT,
-                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
-            )
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts} (rowid, description) VALUES (NEW.id, NEW.description);
+            END
             """
         )
         cursor.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, description)
+                VALUES ('delete', OLD.id, OLD.description);
+            END
             """
-            CREATE TABLE IF NOT EXISTS open_loops (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                description TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'open',
-                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
-            )
+        )
+        cursor.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF description ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, description)
+                VALUES ('delete', OLD.id, OLD.description);
+                INSERT INTO {fts} (rowid, description) VALUES (NEW.id, NEW.description);
+            END
             """
         )
+        # Index whatever the table already holds.
+        cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
 
 
-def seed_defaults(db_path: Path = DB_PATH) -> None:
-    """Seed the database with defaults if empty."""
+def _migrate_signatures(cursor: sqlite3.Cursor) -> None:
+    """Version 9: MinHash signatures of task descriptions for ``poa dedupe``."""
 
-    with get_connection(db_path) as conn:
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS task_signatures (
+            task_id INTEGER PRIMARY KEY,
+            signature BLOB NOT NULL
+        )
+        """
+    )
+    # A signature is only valid for the text it was computed from; dropping
+    # it marks the task for recomputation on the next run.
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS task_signatures_update AFTER UPDATE OF description ON tasks BEGIN
+            DELETE FROM task_signatures WHERE task_id = OLD.id;
+        END
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS task_signatures_delete AFTER DELETE ON tasks BEGIN
+            DELETE FROM task_signatures WHERE task_id = OLD.id;
+        END
+        """
+    )
+
+
+# Tables whose writes bump a counter in ``change_counters``; cached results
+# derived from them are valid while the counters they saw are unchanged.
+CHANGE_TRACKED_TABLES = ("tasks", "open_loops")
+
+
+def _change_trigger_sql(table: str, event: str) -> str:
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_changes_{event} AFTER {event.upper()} ON {table} BEGIN
+            UPDATE change_counters SET version = version + 1 WHERE name = '{table}';
+        END
+        """
+
+
+def _migrate_change_counters(cursor: sqlite3.Cursor) -> None:
+    """Version 10: per-table change counters behind the result cache."""
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS change_counters (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+    for table in CHANGE_TRACKED_TABLES:
+        # Random starting points, so a database recreated at the same path
+        # never repeats the counters of the one it replaced.
+        cursor.execute(
+            "INSERT OR IGNORE INTO change_counters (name, version) VALUES (?, random() >> 1)", (table,)
+        )
+        for event in ("insert", "update", "delete"):
+            cursor.execute(_change_trigger_sql(table, event))
+
+
+# Applied in order; a database at ``PRAGMA user_version`` N has run the
+# first N. Append new steps, never edit or reorder shipped ones.
+MIGRATIONS: List[Callable[[sqlite3.Cursor], None]] = [
+    _migrate_base_schema,
+    _migrate_task_priority,
+    _migrate_git_cache,
+    _migrate_indexes,
+    _setup_energy_rollups,
+    _migrate_meta,
+    _migrate_archive,
+    _migrate_full_text,
+    _migrate_signatures,
+    _migrate_change_counters,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(db_path: Optional[Path] = None) -> int:
+    """Return the schema version recorded in the database header."""
+
+    return connection(db_path).execute("PRAGMA user_version").fetchone()[0]
+
+
+def setup_database(db_path: Optional[Path] = None, seed: bool = False) -> bool:
+    """Bring the schema up to date; return whether any migration ran.
+
+    On a current database this costs a single ``PRAGMA user_version`` read.
+    With ``seed`` the defaults are seeded (once) in the migration's own
+    transaction, so a crash cannot leave a migrated but unseeded database.
+    """
+
+    if schema_version(db_path) >= SCHEMA_VERSION:
+        return False
+    # IMMEDIATE takes the write lock up front, so concurrent first runs
+    # queue up instead of racing through the same migrations.
+    with transaction(db_path, immediate=True) as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return False
         cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM tasks")
-        if cursor.fetchone()[0] == 0:
-            cursor.executemany(
-                """
-                INSERT INTO tasks (
-                    description,
-                    category,
-                    stimulation,
-                    system_building,
-                    automation_potential,
-                    human_interaction,
-                    repetitive,
-                    planned_for_week
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                [
-                    (
-                        task.description,
-                        task.category,
-                        task.stimulation,
-                        task.system_building,
-                        task.automation_potential,
-                        task.human_interaction,
-                        1 if task.repetitive else 0,
-                        1 if task.planned_for_week else 0,
-                    )
-                    for task in DEFAULT_TASKS
-                ],
-            )
-        cursor.execute("SELECT COUNT(*) FROM open_loops")
-        if cursor.fetchone()[0] == 0:
-            cursor.executemany(
-                "INSERT INTO open_loops (description) VALUES (?)",
-                [(loop,) for loop in DEFAULT_OPEN_LOOPS],
+        for migration in MIGRATIONS[version:]:
+            migration(cursor)
+        if seed:
+            _seed_defaults(cursor)
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return True
+
+
+def is_seeded(db_path: Optional[Path] = None) -> bool:
+    """Return whether the default tasks and open loops were ever seeded."""
+
+    with get_connection(db_path) as conn:
+        return conn.execute("SELECT 1 FROM meta WHERE key = 'seeded'").fetchone() is not None
+
+
+def seed_defaults(db_path: Optional[Path] = None) -> None:
+    """Seed the database with defaults once, recorded by the ``seeded`` flag."""
+
+    with transaction(db_path, immediate=True) as conn:
+        _seed_defaults(conn.cursor())
+
+
+def _seed_defaults(cursor: sqlite3.Cursor) -> None:
+    if cursor.execute("SELECT 1 FROM meta WHERE key = 'seeded'").fetchone():
+        return
+    cursor.executemany(
+        """
+        INSERT INTO tasks (
+            description,
+            category,
+            stimulation,
+            system_building,
+            automation_potential,
+            human_interaction,
+            repetitive,
+            planned_for_week
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (
+                task.description,
+                task.category,
+                task.stimulation,
+                task.system_building,
+                task.automation_potential,
+                task.human_interaction,
+                1 if task.repetitive else 0,
+                1 if task.planned_for_week else 0,
             )
+            for task in DEFAULT_TASKS
+        ],
+    )
+    cursor.executemany(
+        "INSERT INTO open_loops (description) VALUES (?)",
+        [(loop,) for loop in DEFAULT_OPEN_LOOPS],
+    )
+    cursor.execute("INSERT INTO meta (key, value) VALUES ('seeded', '1')")
+
+
+class WriteBuffer(Protocol):
+    """Anything that accepts queued inserts, such as ``poa.writer.BufferedWriter``."""
+
+    def submit(self, db_path: Path, sql: str, params: Tuple[object, ...]) -> None: ...
+
+
+# Keyed by pid so a forked child never hands rows to its parent's thread.
+_write_buffer: Optional[Tuple[int, WriteBuffer]] = None
+
+
+def set_write_buffer(buffer: Optional[WriteBuffer]) -> None:
+    """Route event inserts in this process through ``buffer`` (``None`` to stop)."""
+
+    global _write_buffer
+    _write_buffer = None if buffer is None else (os.getpid(), buffer)
+
+
+def _write_event(sql: str, params: Tuple[object, ...], db_path: Optional[Path] = None) -> None:
+    """Insert one event row, through the write buffer when one is installed."""
+
+    buffered = _write_buffer
+    if buffered is not None and buffered[0] == os.getpid():
+        buffered[1].submit(db_path or _active_database.get(), sql, params)
+        return
+    with get_connection(db_path) as conn:
+        conn.execute(sql, params)
 
 
 def record_activity(event: str, details: Optional[Dict[str, object]] = None) -> None:
     """Record an activity log entry."""
 
-    with get_connection() as conn:
-        conn.execute(
-            "INSERT INTO activity_log (event, details) VALUES (?, ?)",
-            (event, json.dumps(details or {})),
-        )
+    _write_event(
+        "INSERT INTO activity_log (event, details) VALUES (?, ?)",
+        (event, json.dumps(details or {})),
+    )
 
 
 def add_focus_session(duration_minutes: int, summary: str) -> None:
@@ -179,66 +872,573 @@ def last_focus_session(within_hours: int = 24) -> Optional[sqlite3.Row]:
 def log_energy(level: int, note: str) -> None:
     """Insert an energy log entry."""
 
-    with get_connection() as conn:
-        conn.execute(
-            "INSERT INTO energy_events (level, note) VALUES (?, ?)",
-            (level, note),
+    _write_event("INSERT INTO energy_events (level, note) VALUES (?, ?)", (level, note))
+
+
+def iter_recent_energy(
+    hours: int = 6,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    batch_size: int = FETCH_BATCH_SIZE,
+) -> Iterator[sqlite3.Row]:
+    """Stream recent energy events, newest first.
+
+    ``after_id`` continues after that event of a previous page.
+    """
+
+    params: List[object] = [_sql_timestamp(datetime.utcnow() - timedelta(hours=hours))]
+    keyset = ""
+    if after_id is not None:
+        keyset = (
+            "AND (created_at < (SELECT created_at FROM energy_events WHERE id = ?) "
+            "OR (created_at = (SELECT created_at FROM energy_events WHERE id = ?) AND id < ?))"
         )
+        params += [after_id, after_id, after_id]
+    return _stream(
+        f"SELECT * FROM energy_events WHERE created_at >= ? {keyset} "
+        "ORDER BY created_at DESC, id DESC LIMIT ?",
+        params,
+        limit,
+        batch_size,
+    )
 
 
 def fetch_recent_energy(hours: int = 6) -> List[sqlite3.Row]:
     """Return recent energy events."""
 
+    return list(iter_recent_energy(hours))
+
+
+def recent_energy_stats(hours: int = 6) -> sqlite3.Row:
+    """Aggregate energy over the last ``hours`` from the hourly rollup.
+
+    The window is widened to the start of the oldest hour, so at most
+    ``hours + 1`` rollup rows are read however much raw history exists.
+    """
+
     cutoff = datetime.utcnow() - timedelta(hours=hours)
     with get_connection() as conn:
         cursor = conn.execute(
-            "SELECT * FROM energy_events WHERE created_at >= ? ORDER BY created_at DESC",
-            (cutoff.isoformat(),),
+            """
+            SELECT
+                COALESCE(SUM(samples), 0) AS samples,
+                COALESCE(SUM(total), 0) AS total,
+                MIN(min_level) AS min_level,
+                MAX(max_level) AS max_level
+            FROM energy_hourly
+            WHERE bucket >= ?
+            """,
+            (cutoff.strftime(ENERGY_ROLLUPS["energy_hourly"]),),
+        )
+        return cursor.fetchone()
+
+
+def fetch_energy_rollups(table: str = "energy_hourly", since: Optional[datetime] = None) -> List[sqlite3.Row]:
+    """Return rollup buckets, oldest first, optionally from ``since`` (UTC)."""
+
+    if table not in ENERGY_ROLLUPS:
+        raise ValueError(f"Unknown energy rollup: {table}")
+    start = since.strftime(ENERGY_ROLLUPS[table]) if since else ""
+    with get_connection() as conn:
+        cursor = conn.execute(
+            f"SELECT * FROM {table} WHERE bucket >= ? ORDER BY bucket",
+            (start,),
         )
         return list(cursor.fetchall())
 
 
+def energy_ema() -> Optional[float]:
+    """Return the exponential moving average of all logged energy levels."""
+
+    with get_connection() as conn:
+        row = conn.execute("SELECT value FROM energy_ema WHERE id = 1").fetchone()
+        return row["value"] if row else None
+
+
+def prune_energy_events(older_than_days: int) -> int:
+    """Delete raw energy events older than the cutoff; rollups are kept."""
+
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    with get_connection() as conn:
+        cursor = conn.execute(
+            "DELETE FROM energy_events WHERE created_at < ?",
+            (_sql_timestamp(cutoff),),
+        )
+        return cursor.rowcount
+
+
+def _archive_cutoff(column: str, moment: datetime) -> str:
+    return moment.isoformat() if column == "started_at" else _sql_timestamp(moment)
+
+
+def _insert_segment(
+    conn: sqlite3.Connection,
+    source: str,
+    period: str,
+    columns: Sequence[str],
+    rows: List[Tuple[object, ...]],
+    level: int,
+) -> Tuple[int, int]:
+    """Store ``rows`` as one compressed segment; return (raw, packed) sizes."""
+
+    raw = json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    payload = zlib.compress(raw, level)
+    conn.execute(
+        """
+        INSERT INTO archive_segments (source, period, first_id, last_id, row_count, columns, payload)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (source, period, rows[0][0], rows[-1][0], len(rows), json.dumps(list(columns)), payload),
+    )
+    return len(raw), len(payload)
+
+
+def archive_events(
+    older_than_days: int,
+    segment_rows: int = ARCHIVE_SEGMENT_ROWS,
+    level: int = 9,
+    db_path: Optional[Path] = None,
+) -> Dict[str, Dict[str, int]]:
+    """Move event rows older than the cutoff into monthly compressed segments.
+
+    Each table is archived in its own transaction: rows are streamed in id
+    order, packed into segments of at most ``segment_rows`` rows per month,
+    and deleted from the live table. Rollups and the energy EMA are kept.
+    Returns per-table counts of rows, segments and raw/compressed bytes.
+    """
+
+    if older_than_days < 1:
+        # A cutoff in the future would archive today's events too.
+        raise ValueError("older_than_days must be at least 1")
+    moment = datetime.utcnow() - timedelta(days=older_than_days)
+    report: Dict[str, Dict[str, int]] = {}
+    for table, column in ARCHIVE_TABLES.items():
+        stats = {"rows": 0, "segments": 0, "raw_bytes": 0, "compressed_bytes": 0}
+        cutoff = _archive_cutoff(column, moment)
+        with transaction(db_path, immediate=True) as conn:
+            cursor = conn.execute(
+                f"SELECT substr({column}, 1, 7) AS period, * FROM {table} "
+                f"WHERE {column} < ? ORDER BY id",
+                (cutoff,),
+            )
+            columns = [description[0] for description in cursor.description[1:]]
+            segments: Dict[str, List[Tuple[object, ...]]] = {}
+            last_id = None
+            try:
+                while True:
+                    batch = cursor.fetchmany(FETCH_BATCH_SIZE)
+                    if not batch:
+                        break
+                    for row in batch:
+                        rows = segments.setdefault(row[0], [])
+                        rows.append(tuple(row)[1:])
+                        last_id = row["id"]
+                        if len(rows) >= segment_rows:
+                            raw, packed = _insert_segment(conn, table, row[0], columns, rows, level)
+                            stats["segments"] += 1
+                            stats["raw_bytes"] += raw
+                            stats["compressed_bytes"] += packed
+                            del segments[row[0]]
+            finally:
+                cursor.close()
+            for period, rows in segments.items():
+                raw, packed = _insert_segment(conn, table, period, columns, rows, level)
+                stats["segments"] += 1
+                stats["raw_bytes"] += raw
+                stats["compressed_bytes"] += packed
+            if last_id is not None:
+                # The immediate transaction keeps writers out, so this removes
+                # exactly the rows that were just packed.
+                stats["rows"] = conn.execute(
+                    f"DELETE FROM {table} WHERE {column} < ? AND id <= ?",
+                    (cutoff, last_id),
+                ).rowcount
+        report[table] = stats
+    return report
+
+
+def iter_archived(
+    source: str, period: Optional[str] = None, db_path: Optional[Path] = None
+) -> Iterator[Dict[str, object]]:
+    """Yield archived rows of ``source`` as dicts, oldest segment first.
+
+    ``period`` narrows the scan to one month (``"YYYY-MM"``).
+    """
+
+    if source not in ARCHIVE_TABLES:
+        raise ValueError(f"Not an archived table: {source}")
+    sql = "SELECT columns, payload FROM archive_segments WHERE source = ?"
+    params: List[object] = [source]
+    if period is not None:
+        sql += " AND period = ?"
+        params.append(period)
+    sql += " ORDER BY first_id, id LIMIT ?"
+    # One segment is decompressed at a time.
+    for segment in _stream(sql, params, None, 1, db_path):
+        columns = json.loads(segment["columns"])
+        for row in json.loads(zlib.decompress(segment["payload"])):
+            yield dict(zip(columns, row))
+
+
+def compact_database(db_path: Optional[Path] = None) -> Dict[str, int]:
+    """Return free pages to the filesystem and refresh planner statistics.
+
+    Databases created before incremental auto-vacuum was configured are
+    converted with a one-off full ``VACUUM``; afterwards only the free pages
+    are released. Must not run inside a transaction.
+    """
+
+    conn = connection(db_path)
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    before = conn.execute("PRAGMA page_count").fetchone()[0]
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    converted = conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2
+    if converted:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    else:
+        # executescript steps the pragma to completion; a plain execute
+        # stops after the first freed page.
+        conn.executescript("PRAGMA incremental_vacuum;")
+    conn.execute("ANALYZE")
+    after = conn.execute("PRAGMA page_count").fetchone()[0]
+    return {
+        "free_pages": free,
+        "bytes_before": before * page_size,
+        "bytes_after": after * page_size,
+        "full_vacuum": int(converted),
+    }
+
+
+_results = ResultCache(RESULT_CACHE_MAX_BYTES, RESULT_CACHE_MAX_ENTRIES)
+
+
+def change_versions(tables: Sequence[str]) -> Tuple[int, ...]:
+    """Current change counters of ``tables`` (see ``CHANGE_TRACKED_TABLES``)."""
+
+    with get_connection() as conn:
+        versions = dict(
+            conn.execute(
+                f"SELECT name, version FROM change_counters WHERE name IN ({', '.join('?' for _ in tables)})",
+                tuple(tables),
+            ).fetchall()
+        )
+    return tuple(versions[table] for table in tables)
+
+
+def cached_call(tables: Sequence[str], key: Hashable, compute: Callable[[], T]) -> T:
+    """Return ``compute()``, from memory while ``tables`` are unchanged.
+
+    ``key`` is scoped to the active database. The counters and the result
+    are read in one snapshot. Inside an open transaction the cache is
+    bypassed: uncommitted writes could otherwise be cached and outlive a
+    rollback.
+    """
+
+    conn = connection()
+    if not RESULT_CACHE or conn.in_transaction:
+        return compute()
+    scoped = (str(_active_database.get()), key)
+    with transaction():
+        versions = change_versions(tables)
+        value = _results.get(scoped, versions)
+        if value is not MISSING:
+            return value
+        value = compute()
+    _results.put(scoped, versions, value)
+    return value
+
+
+def cached(*tables: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorate a storage read so ``cached_call`` serves it, keyed by its arguments."""
+
+    def decorate(func: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(func)
+        def wrapper(*args: Hashable, **kwargs: Hashable) -> T:
+            key = (func.__qualname__, args, tuple(sorted(kwargs.items())))
+            return cached_call(tables, key, functools.partial(func, *args, **kwargs))
+
+        return wrapper
+
+    return decorate
+
+
+def result_cache_stats() -> Dict[str, int]:
+    """Entries, estimated bytes, hits, misses and evictions of the result cache."""
+
+    return _results.stats()
+
+
+def clear_result_cache() -> None:
+    _results.clear()
+
+
+def iter_tasks(
+    order_by_priority: bool = True,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    batch_size: int = FETCH_BATCH_SIZE,
+) -> Iterator[sqlite3.Row]:
+    """Stream tasks by priority (or by id), resuming after ``after_id``."""
+
+    if not order_by_priority:
+        return _stream(
+            "SELECT * FROM tasks WHERE id > ? ORDER BY id LIMIT ?",
+            [after_id if after_id is not None else 0],
+            limit,
+            batch_size,
+        )
+    if after_id is None:
+        return _stream("SELECT * FROM tasks ORDER BY priority DESC, id LIMIT ?", [], limit, batch_size)
+    # Keyset on (priority DESC, id): the leading range keeps the index seek.
+    return _stream(
+        """
+        SELECT * FROM tasks
+        WHERE priority <= (SELECT priority FROM tasks WHERE id = :after)
+          AND (priority < (SELECT priority FROM tasks WHERE id = :after) OR id > :after)
+        ORDER BY priority DESC, id
+        LIMIT :limit
+        """,
+        {"after": after_id},
+        limit,
+        batch_size,
+    )
+
+
+def iter_task_columns(
+    columns: Sequence[str], batch_size: int = FETCH_BATCH_SIZE, active_only: bool = False
+) -> Iterator[List[tuple]]:
+    """Yield batches of plain tuples holding ``columns`` for every task, by id.
+
+    ``active_only`` skips tasks that are done.
+    """
+
+    unknown = set(columns) - TASK_COLUMNS
+    if unknown:
+        raise ValueError(f"Unknown task columns: {sorted(unknown)}")
+    where = f"WHERE {ACTIVE_TASK_SQL} " if active_only else ""
+    cursor = connection().execute(f"SELECT {', '.join(columns)} FROM tasks {where}ORDER BY id")
+    # Tuples are far cheaper than sqlite3.Row when filling column arrays.
+    cursor.row_factory = None
+    try:
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                return
+            yield batch
+    finally:
+        cursor.close()
+
+
+@cached("tasks")
 def fetch_tasks(order_by_priority: bool = True) -> List[sqlite3.Row]:
     """Fetch tasks, optionally ordered by the priority algorithm."""
 
+    return list(iter_tasks(order_by_priority))
+
+
+@cached("tasks")
+def fetch_top_task() -> Optional[sqlite3.Row]:
+    """Return the highest-priority task that is not done."""
+
     with get_connection() as conn:
-        cursor = conn.cursor()
-        if order_by_priority:
-            cursor.execute(
-                """
-                SELECT *, (
-                    stimulation * 3 +
-                    system_building * 2 +
-                    automation_potential * 2 -
-                    human_interaction * 5
-                ) AS priority
-                FROM tasks
-                ORDER BY priority DESC
-                """
-            )
-        else:
-            cursor.execute("SELECT * FROM tasks")
+        cursor = conn.execute(
+            f"SELECT * FROM tasks WHERE {ACTIVE_TASK_SQL} ORDER BY priority DESC, id LIMIT 1"
+        )
+        return cursor.fetchone()
+
+
+@cached("tasks")
+def fetch_chore_task() -> Optional[sqlite3.Row]:
+    """Return the highest-priority boring or maintenance task that is not done."""
+
+    with get_connection() as conn:
+        cursor = conn.execute(
+            f"SELECT * FROM tasks WHERE {ACTIVE_TASK_SQL} AND {CHORE_TASK_SQL} "
+            "ORDER BY priority DESC, id LIMIT 1"
+        )
+        return cursor.fetchone()
+
+
+@cached("tasks")
+def fetch_ignorable_tasks(limit: int = 3) -> List[sqlite3.Row]:
+    """Return people-heavy or worthless tasks that are not done, by priority."""
+
+    with get_connection() as conn:
+        cursor = conn.execute(
+            f"SELECT * FROM tasks WHERE {ACTIVE_TASK_SQL} AND {IGNORABLE_TASK_SQL} "
+            "ORDER BY priority DESC, id LIMIT ?",
+            (limit,),
+        )
         return list(cursor.fetchall())
 
 
+def iter_planned_tasks(
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    batch_size: int = FETCH_BATCH_SIZE,
+) -> Iterator[sqlite3.Row]:
+    """Stream tasks flagged as planned for the week, by id."""
+
+    return _stream(
+        "SELECT * FROM tasks WHERE planned_for_week = 1 AND id > ? ORDER BY id LIMIT ?",
+        [after_id if after_id is not None else 0],
+        limit,
+        batch_size,
+    )
+
+
+@cached("tasks")
 def fetch_planned_tasks() -> List[sqlite3.Row]:
     """Return tasks flagged as planned for the week."""
 
+    return list(iter_planned_tasks())
+
+
+_FTS_TOKEN = re.compile(r"\w+")
+# Above this many AND groups ``fts_query`` falls back to a plain OR.
+MAX_FTS_GROUPS = 64
+
+
+class InvalidSearchQuery(ValueError):
+    """A raw FTS5 query that SQLite could not parse."""
+
+
+def fts_query(text: str, min_terms: Optional[int] = None) -> Optional[str]:
+    """Turn free text into a safe FTS5 query of quoted terms.
+
+    By default every term must match. With ``min_terms`` a row matches when
+    it holds any ``min_terms`` of them, written as an OR of AND groups so
+    each group stays selective; ``min_terms=1`` is a plain OR. Stopwords are
+    dropped. Returns ``None`` when nothing searchable is left.
+    """
+
+    terms = list(
+        dict.fromkeys(
+            f'"{token}"' for token in _FTS_TOKEN.findall(text.lower()) if token not in STOPWORDS
+        )
+    )
+    return fts_combine(terms, min_terms)
+
+
+def fts_combine(terms: Sequence[str], min_terms: Optional[int] = None) -> Optional[str]:
+    """Join ready-made FTS5 terms: all of them, or any ``min_terms`` (see ``fts_query``)."""
+
+    terms = list(terms)
+    if not terms:
+        return None
+    if min_terms is None or min_terms >= len(terms):
+        return " ".join(terms)
+    if min_terms <= 1 or comb(len(terms), min_terms) > MAX_FTS_GROUPS:
+        return " OR ".join(terms)
+    return " OR ".join(f"({' '.join(group)})" for group in combinations(terms, min_terms))
+
+
+def search(match: str, tables: Sequence[str] = ("tasks", "open_loops"), limit: int = 10) -> List[sqlite3.Row]:
+    """Rank tasks and open loops against an FTS5 ``match`` expression.
+
+    Each row carries ``source``, ``id``, ``description``, ``status``, a
+    ``snippet`` with hits in brackets, and ``score`` (bm25, lower is better).
+    A ``match`` FTS5 cannot parse raises ``InvalidSearchQuery``.
+    """
+
+    arms = []
+    for table in tables:
+        fts = f"{table}_fts"
+        if FTS_TABLES.get(fts) != table:
+            raise ValueError(f"Not a searchable table: {table}")
+        arms.append(
+            f"""
+            SELECT * FROM (
+                SELECT '{table}' AS source, c.id, c.description, c.status,
+                       snippet({fts}, 0, '[', ']', '…', 12) AS snippet,
+                       {fts}.rank AS score
+                FROM {fts} JOIN {table} AS c ON c.id = {fts}.rowid
+                WHERE {fts} MATCH :match
+                ORDER BY {fts}.rank
+                LIMIT :limit
+            )
+            """
+        )
     with get_connection() as conn:
-        cursor = conn.execute("SELECT * FROM tasks WHERE planned_for_week = 1")
-        return list(cursor.fetchall())
+        try:
+            cursor = conn.execute(
+                " UNION ALL ".join(arms) + " ORDER BY score LIMIT :limit",
+                {"match": match, "limit": limit},
+            )
+            return list(cursor.fetchall())
+        except sqlite3.OperationalError as exc:
+            # Locked, busy or damaged databases are not the query's fault.
+            if "database" in str(exc):
+                raise
+            raise InvalidSearchQuery(f"invalid search syntax: {exc}") from None
 
 
-def fetch_open_loops() -> List[sqlite3.Row]:
-    """Return open loops that are still active."""
+def similar_tasks(match: str, limit: int = 5) -> List[sqlite3.Row]:
+    """Return the best FTS candidates among tasks that are not done."""
 
     with get_connection() as conn:
         cursor = conn.execute(
-            "SELECT * FROM open_loops WHERE status = 'open' ORDER BY created_at DESC"
+            """
+            SELECT t.id, t.description, t.status
+            FROM tasks_fts JOIN tasks AS t ON t.id = tasks_fts.rowid
+            WHERE tasks_fts MATCH ? AND t.status != 'done'
+            ORDER BY tasks_fts.rank
+            LIMIT ?
+            """,
+            (match, limit),
         )
         return list(cursor.fetchall())
 
 
+def iter_similar_tasks(match: str) -> Iterator[sqlite3.Row]:
+    """Stream every FTS candidate among tasks that are not done, unranked."""
+
+    cursor = connection().execute(
+        """
+        SELECT t.id, t.description, t.status
+        FROM tasks_fts JOIN tasks AS t ON t.id = tasks_fts.rowid
+        WHERE tasks_fts MATCH ? AND t.status != 'done'
+        """,
+        (match,),
+    )
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
+
+
+def iter_open_loops(
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    batch_size: int = FETCH_BATCH_SIZE,
+) -> Iterator[sqlite3.Row]:
+    """Stream open loops that are still active, newest first."""
+
+    params: List[object] = []
+    keyset = ""
+    if after_id is not None:
+        keyset = (
+            "AND (created_at < (SELECT created_at FROM open_loops WHERE id = ?) "
+            "OR (created_at = (SELECT created_at FROM open_loops WHERE id = ?) AND id < ?))"
+        )
+        params += [after_id, after_id, after_id]
+    return _stream(
+        f"SELECT * FROM open_loops WHERE status = 'open' {keyset} "
+        "ORDER BY created_at DESC, id DESC LIMIT ?",
+        params,
+        limit,
+        batch_size,
+    )
+
+
+@cached("open_loops")
+def fetch_open_loops() -> List[sqlite3.Row]:
+    """Return open loops that are still active."""
+
+    return list(iter_open_loops())
+
+
 def close_open_loop(loop_id: int, reason: str) -> None:
     """Close an open loop with a blunt reason."""
 
@@ -256,6 +1456,22 @@ def delete_open_loop(loop_id: int) -> None:
         conn.execute("DELETE FROM open_loops WHERE id = ?", (loop_id,))
 
 
+def apply_open_loop_actions(
+    deletes: Iterable[int], closes: Iterable[Tuple[int, str]]
+) -> None:
+    """Delete and close open loops in bulk within one transaction."""
+
+    with get_connection() as conn:
+        conn.executemany(
+            "DELETE FROM open_loops WHERE id = ?",
+            ((loop_id,) for loop_id in deletes),
+        )
+        conn.executemany(
+            "UPDATE open_loops SET status = 'closed', description = description || ' → ' || ? WHERE id = ?",
+            ((reason, loop_id) for loop_id, reason in closes),
+        )
+
+
 def reopen_open_loop(loop_id: int) -> None:
     """Reopen a previously closed loop."""
 
@@ -270,20 +1486,384 @@ def update_task_status(task_id: int, status: str) -> None:
         conn.execute("UPDATE tasks SET status = ? WHERE id = ?", (status, task_id))
 
 
+# Columns accepted by the bulk importers, in insert order, and the columns
+# written by ``iter_export``. Exports re-import as-is; ids are reassigned.
+IMPORT_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "tasks": (
+        "description",
+        "category",
+        "stimulation",
+        "system_building",
+        "automation_potential",
+        "human_interaction",
+        "repetitive",
+        "status",
+        "planned_for_week",
+        "created_at",
+    ),
+    "open_loops": ("description", "status", "created_at"),
+}
+EXPORT_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "tasks": ("id", *IMPORT_COLUMNS["tasks"], "updated_at", "priority"),
+    "open_loops": ("id", *IMPORT_COLUMNS["open_loops"]),
+}
+IMPORT_CHUNK_SIZE = 10000
+
+
+def _table_indexes(table: str) -> Dict[str, str]:
+    return {name: ddl for name, ddl in INDEXES.items() if f" ON {table} " in ddl}
+
+
+def bulk_insert(
+    table: str,
+    rows: Iterable[Sequence[object]],
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    defer_indexes: bool = False,
+) -> int:
+    """Insert ``rows`` (ordered as ``IMPORT_COLUMNS[table]``) in one transaction.
+
+    Rows are consumed ``chunk_size`` at a time, so memory stays flat however
+    long the input is. ``defer_indexes`` drops the table's secondary indexes
+    first and rebuilds them once at the end, which beats updating them row
+    by row on very large loads. A ``None`` ``created_at`` means now.
+    """
+
+    columns = IMPORT_COLUMNS[table]
+    placeholders = ", ".join(
+        "COALESCE(?, CURRENT_TIMESTAMP)" if column == "created_at" else "?" for column in columns
+    )
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+    deferred = _table_indexes(table) if defer_indexes else {}
+    tracked = table in CHANGE_TRACKED_TABLES
+    inserted = 0
+    with transaction(immediate=True) as conn:
+        for name in deferred:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+        if tracked:
+            # One counter bump for the whole load instead of one per row; the
+            # trigger comes back before commit, so no other writer misses it.
+            conn.execute(f"DROP TRIGGER IF EXISTS {table}_changes_insert")
+        iterator = iter(rows)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                break
+            conn.executemany(sql, chunk)
+            inserted += len(chunk)
+        for ddl in deferred.values():
+            conn.execute(ddl)
+        if tracked:
+            conn.execute(_change_trigger_sql(table, "insert"))
+            conn.execute("UPDATE change_counters SET version = version + 1 WHERE name = ?", (table,))
+    return inserted
+
+
+def iter_export(table: str, batch_size: int = FETCH_BATCH_SIZE) -> Iterator[sqlite3.Row]:
+    """Stream every row of ``table`` with ``EXPORT_COLUMNS``, by id."""
+
+    columns = EXPORT_COLUMNS[table]
+    return _stream(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id LIMIT ?", [], None, batch_size)
+
+
+def reset_signatures(scheme: str) -> bool:
+    """Drop stored signatures unless they were computed under ``scheme``.
+
+    Returns whether anything was dropped. The scheme is recorded in ``meta``.
+    """
+
+    with transaction(immediate=True) as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'signature_scheme'").fetchone()
+        if row is not None and row["value"] == scheme:
+            return False
+        conn.execute("DELETE FROM task_signatures")
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('signature_scheme', ?)", (scheme,)
+        )
+        return row is not None
+
+
+def fetch_task_descriptions(task_ids: Sequence[int]) -> Dict[int, str]:
+    """Map each existing id in ``task_ids`` to its description."""
+
+    descriptions: Dict[int, str] = {}
+    with get_connection() as conn:
+        for start in range(0, len(task_ids), 500):
+            chunk = task_ids[start : start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            for row in conn.execute(f"SELECT id, description FROM tasks WHERE id IN ({placeholders})", chunk):
+                descriptions[row["id"]] = row["description"]
+    return descriptions
+
+
+def fetch_unsigned_tasks(after_id: int = 0, limit: int = IMPORT_CHUNK_SIZE) -> List[sqlite3.Row]:
+    """Return up to ``limit`` active tasks past ``after_id`` that lack a signature."""
+
+    with get_connection() as conn:
+        cursor = conn.execute(
+            f"""
+            SELECT t.id, t.description
+            FROM (SELECT id, description FROM tasks WHERE {ACTIVE_TASK_SQL}) AS t
+            WHERE t.id > ?
+              AND NOT EXISTS (SELECT 1 FROM task_signatures AS s WHERE s.task_id = t.id)
+            ORDER BY t.id
+            LIMIT ?
+            """,
+            (after_id, limit),
+        )
+        return list(cursor.fetchall())
+
+
+def store_signatures(rows: Iterable[Tuple[int, bytes]]) -> int:
+    """Insert or replace ``(task_id, signature)`` rows; return how many."""
+
+    rows = list(rows)
+    with transaction(immediate=True) as conn:
+        conn.executemany("INSERT OR REPLACE INTO task_signatures (task_id, signature) VALUES (?, ?)", rows)
+    return len(rows)
+
+
+def iter_signed_tasks(batch_size: int = FETCH_BATCH_SIZE) -> Iterator[sqlite3.Row]:
+    """Stream active signed tasks (``signature``, ``id``, ``description``) by signature."""
+
+    return _stream(
+        f"""
+        SELECT s.signature, t.id, t.description
+        FROM task_signatures AS s
+        JOIN (SELECT id, description FROM tasks WHERE {ACTIVE_TASK_SQL}) AS t ON t.id = s.task_id
+        ORDER BY s.signature, t.id
+        LIMIT ?
+        """,
+        [],
+        None,
+        batch_size,
+    )
+
+
+def reset_dedupe_candidates() -> None:
+    """Create or empty the connection's temporary ``dedupe_candidates`` table."""
+
+    with get_connection() as conn:
+        conn.execute(
+            """
+            CREATE TEMP TABLE IF NOT EXISTS dedupe_candidates (
+                id INTEGER PRIMARY KEY,
+                signature BLOB NOT NULL,
+                description TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute("DELETE FROM temp.dedupe_candidates")
+
+
+def add_dedupe_candidates(rows: Iterable[Tuple[int, bytes, str]]) -> None:
+    """Add ``(id, signature, description)`` rows to ``dedupe_candidates``."""
+
+    with get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO temp.dedupe_candidates (id, signature, description) VALUES (?, ?, ?)", rows
+        )
+
+
+def iter_candidate_band(offset: int, width: int, batch_size: int = FETCH_BATCH_SIZE) -> Iterator[sqlite3.Row]:
+    """Stream ``dedupe_candidates`` ordered by one band of their signature.
+
+    Rows carry ``bucket`` (``width`` bytes of the signature from byte
+    ``offset``), ``id`` and ``description``; rows sharing a bucket are
+    adjacent, so callers group them without holding the band in memory.
+    """
+
+    return _stream(
+        """
+        SELECT substr(signature, ?, ?) AS bucket, id, description
+        FROM temp.dedupe_candidates
+        ORDER BY bucket, id
+        LIMIT ?
+        """,
+        [offset + 1, width],
+        None,
+        batch_size,
+    )
+
+
+def resolve_duplicate_tasks(groups: Iterable[Tuple[int, Sequence[int]]], merge: bool = False) -> int:
+    """Retire duplicate tasks in bulk; return how many were retired.
+
+    ``groups`` pairs the task to keep with its duplicates. By default the
+    duplicates are marked done; ``merge`` deletes them instead after the
+    kept task inherits their weekly plan flag and earliest ``created_at``.
+    """
+
+    retired = 0
+    with transaction(immediate=True) as conn:
+        for keep, duplicates in groups:
+            ids = list(duplicates)
+            for start in range(0, len(ids), 500):
+                chunk = ids[start : start + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                if merge:
+                    # Ids already gone (stale groups, concurrent deletes) make
+                    # the subqueries NULL; the kept task's values then stay.
+                    conn.execute(
+                        f"""
+                        UPDATE tasks SET
+                            planned_for_week = MAX(planned_for_week, COALESCE((
+                                SELECT MAX(planned_for_week) FROM tasks WHERE id IN ({placeholders})
+                            ), planned_for_week)),
+                            created_at = MIN(created_at, COALESCE((
+                                SELECT MIN(created_at) FROM tasks WHERE id IN ({placeholders})
+                            ), created_at))
+                        WHERE id = ?
+                        """,
+                        (*chunk, *chunk, keep),
+                    )
+                    cursor = conn.execute(f"DELETE FROM tasks WHERE id IN ({placeholders})", chunk)
+                else:
+                    cursor = conn.execute(
+                        f"UPDATE tasks SET status = 'done' WHERE id IN ({placeholders})", chunk
+                    )
+                retired += cursor.rowcount
+    return retired
+
+
+def cached_git_head(repo: str) -> Optional[str]:
+    """Return the HEAD hash recorded at the last sync of ``repo``."""
+
+    with get_connection() as conn:
+        row = conn.execute("SELECT head FROM git_heads WHERE repo = ?", (repo,)).fetchone()
+        return row["head"] if row else None
+
+
+def store_git_commits(
+    repo: str,
+    head: str,
+    commits: Iterable[Tuple[str, str, int, str]],
+    replace: bool = False,
+) -> None:
+    """Cache ``(hash, short_hash, committed_at, subject)`` rows and the new HEAD.
+
+    ``replace`` drops the repository's previously cached commits first.
+    """
+
+    with get_connection() as conn:
+        if replace:
+            conn.execute("DELETE FROM git_commits WHERE repo = ?", (repo,))
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO git_commits (repo, hash, short_hash, committed_at, subject)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            ((repo, *commit) for commit in commits),
+        )
+        conn.execute(
+            """
+            INSERT INTO git_heads (repo, head) VALUES (?, ?)
+            ON CONFLICT (repo) DO UPDATE SET head = excluded.head, synced_at = CURRENT_TIMESTAMP
+            """,
+            (repo, head),
+        )
+
+
+def fetch_git_commits(repos: Sequence[str], since: int) -> List[sqlite3.Row]:
+    """Return cached commits of ``repos`` since a Unix timestamp, newest first."""
+
+    if not repos:
+        return []
+    placeholders = ", ".join("?" for _ in repos)
+    with get_connection() as conn:
+        cursor = conn.execute(
+            f"""
+            SELECT * FROM git_commits
+            WHERE repo IN ({placeholders}) AND committed_at >= ?
+            ORDER BY committed_at DESC, repo, hash
+            """,
+            (*repos, since),
+        )
+        return list(cursor.fetchall())
+
+
 __all__ = [
+    "ACTIVE_TASK_SQL",
+    "ARCHIVE_TABLES",
+    "CHANGE_TRACKED_TABLES",
+    "CHORE_TASK_SQL",
+    "ENERGY_ROLLUPS",
+    "EXPORT_COLUMNS",
+    "FETCH_BATCH_SIZE",
+    "FTS_TABLES",
+    "IGNORABLE_TASK_SQL",
+    "IMPORT_CHUNK_SIZE",
+    "IMPORT_COLUMNS",
+    "INDEXES",
+    "InvalidSearchQuery",
+    "MAX_FTS_GROUPS",
+    "MIGRATIONS",
+    "PRIORITY_SQL",
+    "SCHEMA_VERSION",
+    "TASK_COLUMNS",
+    "WriteBuffer",
+    "add_dedupe_candidates",
     "add_focus_session",
+    "apply_open_loop_actions",
+    "archive_events",
+    "bulk_insert",
+    "cached",
+    "cached_call",
+    "cached_git_head",
+    "change_versions",
+    "clear_result_cache",
+    "close_connections",
     "close_open_loop",
+    "compact_database",
+    "connection",
+    "current_database",
     "delete_open_loop",
+    "energy_ema",
+    "fetch_chore_task",
+    "fetch_energy_rollups",
+    "fetch_git_commits",
+    "fetch_ignorable_tasks",
     "fetch_open_loops",
     "fetch_planned_tasks",
     "fetch_recent_energy",
+    "fetch_task_descriptions",
     "fetch_tasks",
+    "fetch_top_task",
+    "fetch_unsigned_tasks",
+    "fts_combine",
+    "fts_query",
     "get_connection",
+    "is_seeded",
+    "iter_archived",
+    "iter_candidate_band",
+    "iter_export",
+    "iter_open_loops",
+    "iter_planned_tasks",
+    "iter_recent_energy",
+    "iter_signed_tasks",
+    "iter_similar_tasks",
+    "iter_task_columns",
+    "iter_tasks",
     "last_focus_session",
+    "list_users",
     "log_energy",
+    "prune_energy_events",
+    "recent_energy_stats",
     "record_activity",
     "reopen_open_loop",
+    "reset_dedupe_candidates",
+    "reset_signatures",
+    "resolve_duplicate_tasks",
+    "result_cache_stats",
+    "schema_version",
+    "search",
     "seed_defaults",
+    "set_write_buffer",
     "setup_database",
+    "shard_path",
+    "similar_tasks",
+    "store_git_commits",
+    "store_signatures",
+    "transaction",
     "update_task_status",
+    "use_database",
 ]
@@ -0,0 +1,177 @@
+"""Streaming CSV/JSONL import and export of tasks and open loops."""
+
+from __future__ import annotations
+
+import csv
+import json
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional, TextIO, Tuple
+
+from . import storage
+
+
+FORMATS = ("csv", "jsonl")
+# CLI names for the tables that can be moved in and out.
+KINDS = {"tasks": "tasks", "loops": "open_loops"}
+
+_TRUE = {"1", "true", "yes", "y", "t"}
+_FALSE = {"", "0", "false", "no", "n", "f"}
+
+Scorer = Callable[[str], Mapping[str, int]]
+
+
+def detect_format(path: Optional[str], default: str = "jsonl") -> str:
+    """Guess the format from a file name; ``default`` for stdin and unknowns."""
+
+    if path and path.lower().endswith(".csv"):
+        return "csv"
+    if path and path.lower().endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    return default
+
+
+def read_records(stream: TextIO, fmt: str) -> Iterator[Dict[str, Any]]:
+    """Yield one dict per CSV row or JSONL line, lazily."""
+
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line_number, line in enumerate(stream, start=1):
+        text = line.strip()
+        if not text:
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError as exc:
+            raise ValueError(f"line {line_number}: {exc}") from None
+        if not isinstance(record, dict):
+            raise ValueError(f"line {line_number}: expected a JSON object")
+        yield record
+
+
+# Import field -> key in the assistant's keyword score used when it is missing.
+_METRIC_FIELDS = (
+    ("stimulation", "intellectual_stimulation"),
+    ("system_building", "system_building"),
+    ("automation_potential", "automation_potential"),
+    ("human_interaction", "human_interaction"),
+)
+
+
+def _as_flag(value: Any, key: str, default: bool) -> int:
+    if value is None:
+        return int(default)
+    if isinstance(value, bool):
+        return int(value)
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return 1
+    if text in _FALSE:
+        return 0
+    raise ValueError(f"{key}: not a boolean: {value!r}")
+
+
+def task_row(record: Mapping[str, Any], scorer: Scorer) -> Tuple[object, ...]:
+    """Normalise one record into ``storage.IMPORT_COLUMNS["tasks"]`` order.
+
+    Only ``description`` is required; metrics that are missing come from
+    the keyword rules via ``scorer``.
+    """
+
+    get = record.get
+    description = str(get("description") or get("title") or "").strip()
+    if not description:
+        raise ValueError("task record without a description")
+    values = [get(field) for field, _ in _METRIC_FIELDS]
+    repetitive = get("repetitive")
+    if None in values or "" in values or repetitive is None:
+        metrics = scorer(description)
+        values = [
+            metrics.get(score_key, 0) if value in (None, "") else value
+            for value, (_, score_key) in zip(values, _METRIC_FIELDS)
+        ]
+        if repetitive is None:
+            repetitive = bool(metrics.get("repetition", 0))
+    stimulation, system_building, automation_potential, human_interaction = map(int, values)
+    return (
+        description,
+        str(get("category") or "imported"),
+        stimulation,
+        system_building,
+        automation_potential,
+        human_interaction,
+        _as_flag(repetitive, "repetitive", False),
+        str(get("status") or "pending"),
+        _as_flag(get("planned_for_week"), "planned_for_week", False),
+        get("created_at") or None,
+    )
+
+
+def open_loop_row(record: Mapping[str, Any]) -> Tuple[object, ...]:
+    """Normalise one record into ``storage.IMPORT_COLUMNS["open_loops"]`` order."""
+
+    description = str(record.get("description") or record.get("title") or "").strip()
+    if not description:
+        raise ValueError("open loop record without a description")
+    return description, str(record.get("status") or "open"), record.get("created_at") or None
+
+
+def _rows(kind: str, records: Iterable[Mapping[str, Any]], scorer: Scorer) -> Iterator[Tuple[object, ...]]:
+    for number, record in enumerate(records, start=1):
+        try:
+            yield task_row(record, scorer) if kind == "tasks" else open_loop_row(record)
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"record {number}: {exc}") from None
+
+
+def import_records(
+    kind: str,
+    records: Iterable[Mapping[str, Any]],
+    scorer: Scorer,
+    chunk_size: int = storage.IMPORT_CHUNK_SIZE,
+    defer_indexes: bool = False,
+) -> int:
+    """Import ``records`` into ``kind`` ("tasks" or "loops"); all or nothing."""
+
+    table = KINDS[kind]
+    # Backlogs repeat themselves; score each distinct description once.
+    cached_scorer = lru_cache(maxsize=65536)(scorer)
+    return storage.bulk_insert(
+        table,
+        _rows(table, records, cached_scorer),
+        chunk_size=chunk_size,
+        defer_indexes=defer_indexes,
+    )
+
+
+def export_records(kind: str, out: TextIO, fmt: str) -> int:
+    """Stream every row of ``kind`` to ``out``; return the number written."""
+
+    table = KINDS[kind]
+    columns = storage.EXPORT_COLUMNS[table]
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(columns)
+        for row in storage.iter_export(table):
+            writer.writerow(tuple(row))
+            count += 1
+        return count
+    write = out.write
+    for row in storage.iter_export(table):
+        write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        write("\n")
+        count += 1
+    return count
+
+
+__all__ = [
+    "FORMATS",
+    "KINDS",
+    "detect_format",
+    "export_records",
+    "import_records",
+    "open_loop_row",
+    "read_records",
+    "task_row",
+]
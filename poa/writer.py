@@ -0,0 +1,193 @@
+"""Buffered background writer that group-commits high-frequency events.
+
+Once installed, ``storage.record_activity`` and ``storage.log_energy`` hand
+their inserts to a queue instead of committing on the caller's thread. A
+single writer thread drains the queue and commits everything it collected
+in one transaction per batch, so many events share one fsync.
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import storage
+from .config import (
+    WRITE_BATCH_SIZE,
+    WRITE_DURABILITY,
+    WRITE_FLUSH_INTERVAL,
+    WRITE_QUEUE_SIZE,
+)
+
+
+# ``PRAGMA synchronous`` for the writer's own connection. "off" leaves the
+# fsync to the OS and can lose the last batches on power loss; "full" syncs
+# the WAL on every commit.
+DURABILITY_LEVELS = {"off": "OFF", "normal": "NORMAL", "full": "FULL"}
+
+Write = Tuple[str, str, Tuple[object, ...]]
+
+
+class BufferedWriter:
+    """Queue inserts and commit them from one background thread.
+
+    The queue holds at most ``max_queue`` pending writes; when it is full the
+    caller blocks until the writer catches up, which bounds memory. A batch
+    is committed once ``batch_size`` writes are waiting or ``flush_interval``
+    seconds after its first write, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = WRITE_BATCH_SIZE,
+        flush_interval: float = WRITE_FLUSH_INTERVAL,
+        max_queue: int = WRITE_QUEUE_SIZE,
+        durability: str = WRITE_DURABILITY,
+    ) -> None:
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability level: {durability}")
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self.written = 0
+        self.failed = 0
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=max(1, max_queue))
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="poa-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, db_path: Path, sql: str, params: Tuple[object, ...]) -> None:
+        """Queue one write; blocks only while the queue is full."""
+
+        if self._closed:
+            raise RuntimeError("poa writer is closed")
+        self._queue.put((str(db_path), sql, params))
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until every write submitted so far is committed.
+
+        Raises ``RuntimeError`` if a batch failed since the last flush.
+        """
+
+        if not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        if not done.wait(timeout):
+            raise RuntimeError("poa writer did not flush in time")
+        error, self._error = self._error, None
+        if error is not None:
+            raise RuntimeError(f"buffered write failed: {error}") from error
+
+    def close(self) -> None:
+        """Flush pending writes and stop the writer thread."""
+
+        if self._closed or os.getpid() != self._pid:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first: object) -> Tuple[List[Write], List[object]]:
+        """Gather a batch that starts with ``first``; also return control items."""
+
+        writes: List[Write] = []
+        controls: List[object] = []
+        item = first
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if isinstance(item, tuple):
+                writes.append(item)
+            else:
+                # Flush requests and the stop marker end the batch right away.
+                controls.append(item)
+                break
+            if len(writes) >= self.batch_size:
+                break
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+        return writes, controls
+
+    def _commit(self, writes: List[Write]) -> None:
+        grouped: Dict[str, Dict[str, List[Tuple[object, ...]]]] = {}
+        for db_path, sql, params in writes:
+            grouped.setdefault(db_path, {}).setdefault(sql, []).append(params)
+        for db_path, statements in grouped.items():
+            path = Path(db_path)
+            conn = storage.connection(path)
+            conn.execute(f"PRAGMA synchronous = {DURABILITY_LEVELS[self.durability]}")
+            try:
+                with storage.transaction(path) as conn:
+                    for sql, rows in statements.items():
+                        conn.executemany(sql, rows)
+            except Exception as exc:  # surfaced by the next flush()
+                self._error = exc
+                self.failed += sum(len(rows) for rows in statements.values())
+            else:
+                self.written += sum(len(rows) for rows in statements.values())
+
+    def _run(self) -> None:
+        try:
+            while True:
+                writes, controls = self._collect(self._queue.get())
+                if writes:
+                    self._commit(writes)
+                for control in controls:
+                    if control is None:
+                        return
+                    control.set()
+        finally:
+            storage.close_connections()
+
+
+_writer: Optional[BufferedWriter] = None
+_lock = threading.Lock()
+
+
+def install(**options: object) -> BufferedWriter:
+    """Route event writes in this process through a ``BufferedWriter``.
+
+    Idempotent; ``options`` only apply when the writer is first created.
+    """
+
+    global _writer
+    with _lock:
+        if _writer is None or _writer._pid != os.getpid():
+            _writer = BufferedWriter(**options)  # type: ignore[arg-type]
+            storage.set_write_buffer(_writer)
+        return _writer
+
+
+def uninstall() -> None:
+    """Flush pending writes and go back to committing on the caller's thread."""
+
+    global _writer
+    with _lock:
+        writer, _writer = _writer, None
+        if writer is not None and writer._pid == os.getpid():
+            storage.set_write_buffer(None)
+            writer.close()
+
+
+def flush(timeout: Optional[float] = None) -> None:
+    """Commit everything buffered so far; a no-op without a writer."""
+
+    writer = _writer
+    if writer is not None and writer._pid == os.getpid():
+        writer.flush(timeout)
+
+
+atexit.register(uninstall)
+
+
+__all__ = ["BufferedWriter", "DURABILITY_LEVELS", "flush", "install", "uninstall"]
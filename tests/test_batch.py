@@ -0,0 +1,24 @@
+"""Tests for batch input parsing."""
+
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from poa.batch import iter_descriptions
+
+
+def test_plain_and_json_lines() -> None:
+    stream = io.StringIO('Ship it\n\n"Write docs"\n{"description": "Fix CI"}\n{"title": "Plan"}\n')
+    assert list(iter_descriptions(stream)) == ["Ship it", "Write docs", "Fix CI", "Plan"]
+
+
+def test_plain_line_starting_with_quote_or_brace() -> None:
+    stream = io.StringIO('"Fix" the flaky build\n{draft} release notes\n')
+    assert list(iter_descriptions(stream)) == ['"Fix" the flaky build', "{draft} release notes"]
+
+
+def test_json_record_without_description() -> None:
+    with pytest.raises(ValueError):
+        list(iter_descriptions(io.StringIO('{"id": 3}\n')))